@@ -1,5 +1,10 @@
-import ROOT
-from collections import Counter
+import awkward as ak
+import numpy as np
+import uproot
+
+# The occupancy cut lives with the reduction filters (it is also a stage of
+# run_reduction); the project root is on PYTHONPATH (setup.sh)
+from reduce_event.filters.occupancy import accept_events_chunk
 
 # ==============================
 # Core: Event-level occupancy cut
@@ -16,50 +21,41 @@ def accept_event(detector_ids, max_hits):
     - True if the event passes all occupancy cuts
     - False otherwise
     """
-
-    counts = Counter(detector_ids)
-
-    nHitsD0  = sum(counts[i] for i in range(1, 7))     # planes 1–6
-    nHitsD1  = sum(counts[i] for i in range(7, 13))    # 7–12
-    nHitsD2  = sum(counts[i] for i in range(13, 19))   # 13–18
-    nHitsD3p = sum(counts[i] for i in range(19, 25))   # 19–24
-    nHitsD3m = sum(counts[i] for i in range(25, 31))   # 25–30
-
-    if nHitsD0  > max_hits["D0"]:  return False
-    if nHitsD1  > max_hits["D1"]:  return False
-    if nHitsD2  > max_hits["D2"]:  return False
-    if nHitsD3p > max_hits["D3p"]: return False
-    if nHitsD3m > max_hits["D3m"]: return False
-
-    return True
+    offsets = np.array([0, len(detector_ids)], dtype=np.int64)
+    return bool(accept_events_chunk(detector_ids, offsets, max_hits)[0])
 
 # ==============================
 # Wrapper: Process full ROOT file
 # ==============================
-def run_accept_event_on_file(root_filename, max_hits):
+def run_accept_event_on_file(root_filename, max_hits, step_size=10000):
     """
-    Opens a ROOT file and applies accept_event() to each event.
+    Opens a ROOT file with uproot and applies the occupancy cut to every event.
+    Only detectorID is read, step_size events at a time, and each chunk is cut
+    at once (per-region counts from one np.bincount).
 
     Parameters:
     - root_filename: path to the input ROOT file
     - max_hits: dictionary with thresholds for D0, D1, D2, D3p, D3m
+    - step_size: number of events read per chunk
 
     Returns:
     - List of accepted event indices
     """
-    file = ROOT.TFile.Open(root_filename, "READ")
-    tree = file.Get("tree")
-    if not tree:
-        raise RuntimeError(f"Could not find TTree 'tree' in {root_filename}")
+    with uproot.open(root_filename) as file:
+        if "tree" not in file:
+            raise RuntimeError(f"Could not find TTree 'tree' in {root_filename}")
+        tree = file["tree"]
 
-    accepted_indices = []
+        accepted_indices = []
 
-    for i, event in enumerate(tree):
-        detector_ids = list(event.detectorID)
-        if accept_event(detector_ids, max_hits):
-            accepted_indices.append(i)
+        for arrays, report in tree.iterate(["detectorID"], step_size=step_size, library="ak",
+                                           how=dict, report=True):
+            detector_ids = arrays["detectorID"]
+            offsets = np.zeros(len(detector_ids) + 1, dtype=np.int64)
+            np.cumsum(ak.to_numpy(ak.num(detector_ids)), out=offsets[1:])
+            accepted = accept_events_chunk(ak.to_numpy(ak.flatten(detector_ids)), offsets, max_hits)
+            accepted_indices.extend((report.tree_entry_start + np.flatnonzero(accepted)).tolist())
 
-    file.Close()
     return accepted_indices
 
 # ==============================
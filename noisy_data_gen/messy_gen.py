@@ -1,4 +1,3 @@
-import ROOT
 import numpy as np
 from array import array
 
@@ -20,6 +19,9 @@ def inject_tracks(file1, file2, output_file, num_tracks, prob_mean, prob_width):
     if prob_width < 0:
         raise ValueError("prob_width must be non-negative.")
 
+    # Imported here so the module (and its constants) can be imported without ROOT
+    import ROOT
+
     f1 = ROOT.TFile.Open(file1, "READ")
     f2 = ROOT.TFile.Open(file2, "READ")
     tree1 = f1.Get("tree")
@@ -1,4 +1,3 @@
-import ROOT
 import random
 import argparse
 
@@ -46,6 +45,9 @@ def inject_noise_into_event(detectorID, elementID, driftDistance, tdcTime):
 
 
 def inject_noise(input_file):
+    # Imported here so inject_noise_into_event can be used without ROOT
+    import ROOT
+
     fin = ROOT.TFile.Open(input_file, "READ")
     tree_in = fin.Get("tree")
 
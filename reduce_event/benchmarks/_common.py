@@ -0,0 +1,22 @@
+"""
+Paths and the timing helper shared by the benchmark scripts.
+"""
+
+import os
+import time
+
+REDUCE_EVENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_TSV = os.path.join(REDUCE_EVENT_DIR, "geom", "data", "param.tsv")
+
+
+def best_time(fn, repeat):
+    """
+    Best wall time of repeat calls, after one warm-up call.
+    """
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
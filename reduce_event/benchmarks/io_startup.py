@@ -0,0 +1,196 @@
+"""
+Startup and throughput of the uproot and ROOT I/O backends.
+
+Each backend runs in a fresh interpreter, so its import cost is measured the
+way every run (and every worker process) pays it. Phases per backend:
+
+    import       get_backend(backend), i.e. importing uproot or PyROOT
+    open         EventSource + detect_hit_branches
+    first_chunk  first chunk of hit arrays from iter_hit_chunks
+    read         the remaining chunks
+    write        the reduced tree (all hits kept) through the backend writer
+    process      wall time of the whole child process, interpreter start included
+
+Without --input a synthetic file is generated from benchmarks.synthetic. It
+is written with ROOT when ROOT is importable, so both backends read
+std::vector branches as in real files; otherwise it is written with uproot
+and only the uproot backend is timed.
+
+    python3 -m benchmarks.io_startup --events 20000
+    python3 -m benchmarks.io_startup --input data.root --backends uproot root --output io.json
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from benchmarks._common import DEFAULT_TSV, REDUCE_EVENT_DIR
+
+PHASES = ("import", "open", "first_chunk", "read", "write", "process")
+BASKET_EVENTS = 1000
+
+
+def have_root():
+    return importlib.util.find_spec("ROOT") is not None
+
+
+def write_input(path, chunk, backend):
+    """
+    Writes the synthetic chunk as a 'tree' with eventID and the hit branches.
+    """
+    from utils.io_helpers import HIT_BRANCHES, NP_DTYPES
+    offsets = chunk["offsets"]
+    n_events = offsets.size - 1
+
+    if backend == "root":
+        import ROOT
+        from utils.root_io import fill_vector
+
+        f = ROOT.TFile.Open(path, "RECREATE")
+        tree = ROOT.TTree("tree", "synthetic hits")
+        event_id = np.zeros(1, dtype=np.int32)
+        tree.Branch("eventID", event_id, "eventID/I")
+        vectors = {name: ROOT.std.vector(ctype)() for name, ctype in HIT_BRANCHES.items()}
+        for name, vec in vectors.items():
+            tree.Branch(name, vec)
+
+        for k in range(n_events):
+            event_id[0] = k
+            for name, vec in vectors.items():
+                fill_vector(vec, HIT_BRANCHES[name], chunk[name][offsets[k]:offsets[k + 1]])
+            tree.Fill()
+        tree.Write()
+        f.Close()
+    else:
+        import awkward as ak
+        import uproot
+
+        types = dict(eventID=np.int32, **{name: f"var * {np.dtype(NP_DTYPES[ctype]).name}"
+                                          for name, ctype in HIT_BRANCHES.items()})
+        with uproot.recreate(path) as f:
+            tree = f.mktree("tree", types)
+            # One basket per BASKET_EVENTS events, as ROOT's auto-flush would make
+            for lo in range(0, n_events, BASKET_EVENTS):
+                hi = min(lo + BASKET_EVENTS, n_events)
+                data = {name: ak.unflatten(chunk[name][offsets[lo]:offsets[hi]], np.diff(offsets[lo:hi + 1]))
+                        for name in HIT_BRANCHES}
+                data["eventID"] = np.arange(lo, hi, dtype=np.int32)
+                tree.extend(data)
+
+
+def time_backend(backend, input_file, step_size, output_dir):
+    """
+    Runs the phases in this process; meant to be called in a fresh interpreter.
+    """
+    times = {}
+    t0 = time.perf_counter()
+    from utils.io_helpers import get_backend
+    io = get_backend(backend)
+    t1 = time.perf_counter()
+    times["import"] = t1 - t0
+
+    source = io.EventSource(input_file)
+    hit_branches = source.detect_hit_branches()
+    t2 = time.perf_counter()
+    times["open"] = t2 - t1
+
+    chunk_iter = source.iter_hit_chunks(step_size, hit_branches)
+    chunks = [c for c in [next(chunk_iter, None)] if c is not None]
+    t3 = time.perf_counter()
+    times["first_chunk"] = t3 - t2
+    chunks += list(chunk_iter)
+    t4 = time.perf_counter()
+    times["read"] = t4 - t3
+
+    writer = source.writer(os.path.join(output_dir, f"reduced_{backend}.root"), hit_branches)
+    for entry_start, hits, offsets in chunks:
+        writer.write_chunk(entry_start, hits, offsets, np.ones(int(offsets[-1]), dtype=bool))
+    writer.close()
+    source.close()
+    times["write"] = time.perf_counter() - t4
+    return times
+
+
+def run_child(backend, input_file, step_size, output_dir):
+    """
+    Times one backend in a new interpreter; returns the phase times or None on failure.
+    """
+    cmd = [sys.executable, "-m", "benchmarks.io_startup", "--child", backend,
+           "--input", input_file, "--step-size", str(step_size), "--workdir", output_dir]
+    t0 = time.perf_counter()
+    out = subprocess.run(cmd, capture_output=True, text=True, cwd=REDUCE_EVENT_DIR)
+    elapsed = time.perf_counter() - t0
+    if out.returncode != 0:
+        print(f"[WARNING] {backend} backend failed:\n{out.stderr.strip()[-2000:]}")
+        return None
+    times = json.loads(out.stdout.strip().splitlines()[-1])
+    times["process"] = elapsed
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="ROOT file with a 'tree' (default: generate synthetic events)")
+    parser.add_argument("--backends", nargs="+", choices=("uproot", "root"),
+                        help="Backends to time (default: uproot, plus root if importable)")
+    parser.add_argument("--events", type=int, default=20000, help="Synthetic events when no --input is given")
+    parser.add_argument("--step-size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3, help="Child runs per backend; the best is kept")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(time_backend(args.child, args.input, args.step_size, args.workdir)))
+        return 0
+
+    backends = args.backends or (["uproot", "root"] if have_root() else ["uproot"])
+    workdir = tempfile.mkdtemp(prefix="io_startup_")
+    try:
+        input_file = args.input
+        if input_file is None:
+            from geom.geom_service import GeometryService
+            from benchmarks.synthetic import make_chunk
+            writer_backend = "root" if have_root() else "uproot"
+            if writer_backend == "uproot" and "root" in backends:
+                print("[INFO] ROOT is not importable; timing the uproot backend only.")
+                backends = [b for b in backends if b != "root"]
+            input_file = os.path.join(workdir, "synthetic.root")
+            chunk = make_chunk(GeometryService(tsv_path=DEFAULT_TSV), args.events, seed=args.seed)
+            write_input(input_file, chunk, writer_backend)
+            print(f"{args.events} synthetic events, {int(chunk['offsets'][-1])} hits "
+                  f"(written with {writer_backend})")
+
+        results = {}
+        for backend in backends:
+            runs = [run_child(backend, input_file, args.step_size, workdir) for _ in range(args.repeat)]
+            runs = [r for r in runs if r is not None]
+            if runs:
+                results[backend] = {phase: min(r[phase] for r in runs) for phase in PHASES}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'backend':>8} | " + " | ".join(f"{phase:>11}" for phase in PHASES) + "   [s]")
+    print("-" * (11 + 14 * len(PHASES)))
+    for backend, times in results.items():
+        print(f"{backend:>8} | " + " | ".join(f"{times[phase]:11.3f}" for phase in PHASES))
+
+    if args.output:
+        config = {"input": args.input, "events": None if args.input else args.events,
+                  "step_size": args.step_size, "repeat": args.repeat}
+        with open(args.output, "w") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+        print(f"\nWrote results to '{args.output}'")
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Parity check and timing of the Numba kernels against the NumPy filters.
+
+Builds a synthetic chunk of events with benchmarks.synthetic, runs
+decluster_hits_chunk and sagitta_reducer_chunk once with jit_kernels.USE_JIT
+on and once off, and exits non-zero if the keep masks differ.
+
+    python3 -m benchmarks.jit_parity --events 2000 --hits 60
+"""
+
+import argparse
+import sys
+import time
+import numpy as np
+from geom.geom_service import GeometryService
+from filters import jit_kernels
+from filters import decluster_hits
+from filters.decluster_hits import decluster_hits_chunk
+from filters.sagitta import sagitta_reducer_chunk
+from hit_batch import HitBatch
+from benchmarks.synthetic import REGIONS, make_chunk
+from benchmarks._common import DEFAULT_TSV
+
+
+def run_both(fn, make_batch, keep, repeat):
+    """
+    Returns (mask_numpy, mask_jit, t_numpy, t_jit); t is the best of repeat runs.
+    """
+    out, times = {}, {}
+    for use_jit in (False, True):
+        jit_kernels.USE_JIT = use_jit
+        fn(make_batch(), keep)  # warm-up, includes JIT compilation
+        best = float("inf")
+        for _ in range(repeat):
+            batch = make_batch()
+            t0 = time.perf_counter()
+            out[use_jit] = fn(batch, keep)
+            best = min(best, time.perf_counter() - t0)
+        times[use_jit] = best
+    return out[False], out[True], times[False], times[True]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tsv", default=DEFAULT_TSV, help="Geometry TSV (default: bundled param.tsv)")
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--hits", type=float, default=60,
+                        help="Mean chamber hits per event, split evenly over the regions")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if not jit_kernels.HAVE_NUMBA:
+        print("Numba is not installed; only the NumPy backend is available.")
+        return 0
+
+    geom = GeometryService(tsv_path=args.tsv)
+    chunk = make_chunk(geom, args.events, dict.fromkeys(REGIONS, args.hits / len(REGIONS)),
+                       cluster_fraction=0.3, seed=args.seed)
+    det, elem, drift, tdc, offsets = (chunk[name] for name in
+                                      ("detectorID", "elementID", "driftDistance", "tdcTime", "offsets"))
+    make_batch = lambda: HitBatch.from_chunk(det, elem, drift, tdc, offsets, geom=geom)
+    keep = np.ones(det.size, dtype=bool)
+
+    failed = False
+    print(f"{'filter':>22} | {'numpy [ms]':>10} | {'jit [ms]':>9} | same")
+    print("-" * 55)
+    for flush in (False, True):
+        decluster_hits._FLUSH_FINAL_CLUSTER = flush
+        name = "decluster" + (" (flush)" if flush else "")
+        ref, got, t_ref, t_jit = run_both(decluster_hits_chunk, make_batch, keep, args.repeat)
+        same = np.array_equal(ref, got)
+        failed |= not same
+        print(f"{name:>22} | {1e3 * t_ref:10.2f} | {1e3 * t_jit:9.2f} | {same}")
+    decluster_hits._FLUSH_FINAL_CLUSTER = False
+
+    ref, got, t_ref, t_jit = run_both(sagitta_reducer_chunk, make_batch, keep, args.repeat)
+    same = np.array_equal(ref, got)
+    failed |= not same
+    print(f"{'sagitta':>22} | {1e3 * t_ref:10.2f} | {1e3 * t_jit:9.2f} | {same}")
+
+    jit_kernels.USE_JIT = jit_kernels.HAVE_NUMBA
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
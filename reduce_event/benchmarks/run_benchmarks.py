@@ -0,0 +1,309 @@
+"""
+Benchmarks every filter and the full reduction on synthetic events.
+
+Runs offline on the bundled geometry. Each filter is timed as the chunk
+version the engine uses (on one HitBatch with all hits kept) and, with
+--reference, as the original per-event list function. "pipeline" is
+run_reduce_event.reduce_chunks, the loop run_reduction drives, on the whole
+chunk with every geometry filter on and without file I/O (io_startup times
+that); --reference adds "reduce_event", the per-event entry point, called on
+every event. --reference also checks that every chunk filter keeps exactly the
+hits its list function keeps, and exits non-zero if one does not. --write
+adds "write_<backend>_<mode>": the events written to a temporary file and
+their reduced tree (pipeline keep mask) written back through the backend
+writer, for uproot and, when ROOT is importable, for ROOT in the bulk and
+the old per-hit push_back write modes. With --events 10000 this is the
+write workload of the J/psi noisy file (MC_JPsi_Pythia8_Target_April17_10000).
+Results are stored as JSON; --compare flags every case that got slower than the
+baseline by more than --threshold and exits non-zero.
+
+    python3 -m benchmarks.run_benchmarks --events 5000 --output bench.json
+    python3 -m benchmarks.run_benchmarks --compare bench.json --threshold 0.2
+    python3 -m benchmarks.run_benchmarks --events 10000 --write
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import numpy as np
+from geom.geom_service import GeometryService
+from engine import reduce_chunk
+from run_reduce_event import reduce_chunks, reduce_event
+from utils.io_helpers import get_backend
+from hit_batch import HitBatch
+from filters import jit_kernels
+from filters.deduplicate_hits import deduplicate_hits, deduplicate_hits_chunk
+from filters.decluster_hits import decluster_hits, decluster_hits_chunk
+from filters.hodo_mask import hodo_mask, hodo_mask_chunk
+from filters.out_of_time_removal import remove_out_of_time_hits, remove_out_of_time_hits_chunk
+from filters.sagitta import sagitta_reducer, sagitta_reducer_chunk
+from benchmarks.synthetic import DEFAULT_OCCUPANCY, HODO_IDS, REGIONS, make_chunk
+from benchmarks.io_startup import have_root, write_input
+from benchmarks._common import DEFAULT_TSV, best_time
+
+# Same window for every detector, cutting the tails of make_chunk's TDC times
+TDC_WINDOWS = (np.full(64, 820.0), np.full(64, 980.0))
+PIPELINE_FILTERS = dict(dedup=True, decluster=True, hodomask=True, sagitta=True)
+WRITE_STEP_SIZE = 10000
+
+
+def chunk_cases(geom, chunk):
+    """
+    (name, callable) for the chunk filters and the full pipeline.
+    """
+    cols = (chunk["detectorID"], chunk["elementID"], chunk["driftDistance"], chunk["tdcTime"],
+            chunk["offsets"])
+    batch = HitBatch.from_chunk(*cols, geom=geom)
+    batch.uid, batch.wire_pos, batch.z, batch.ptype   # derived columns built once, outside the timers
+    keep = np.ones(len(batch), dtype=bool)
+    hodo_ids = set(HODO_IDS)
+    hits = {name: chunk[name] for name in ("detectorID", "elementID", "driftDistance", "tdcTime")}
+
+    return [
+        ("hit_batch", lambda: HitBatch.from_chunk(*cols, geom=geom).wire_pos),
+        ("deduplicate_hits", lambda: deduplicate_hits_chunk(batch, keep)),
+        ("out_of_time", lambda: remove_out_of_time_hits_chunk(batch, TDC_WINDOWS, keep)),
+        ("decluster_hits", lambda: decluster_hits_chunk(batch, keep)),
+        ("hodo_mask", lambda: hodo_mask_chunk(batch, hodo_ids, keep)),
+        ("sagitta_reducer", lambda: sagitta_reducer_chunk(batch, keep)),
+        ("pipeline", lambda: reduce_chunks(iter([(0, hits, chunk["offsets"])]), lambda *chunk_keep: None,
+                                           geom=geom, hodo_ids=hodo_ids, **PIPELINE_FILTERS)),
+    ]
+
+
+def filter_pairs(geom):
+    """
+    (name, chunk filter, list filter) of every filter; the chunk filter is
+    called as fn(batch, keep), the list filter as fn(det, elem, drift, tdc, keep_idx).
+    """
+    hodo_ids = set(HODO_IDS)
+    return [
+        ("deduplicate_hits", deduplicate_hits_chunk,
+         lambda d, e, dr, t, k: deduplicate_hits(d, e, k)),
+        ("out_of_time", lambda b, k: remove_out_of_time_hits_chunk(b, TDC_WINDOWS, k),
+         lambda d, e, dr, t, k: remove_out_of_time_hits(t, k, detectorIDs=d, tdc_windows=TDC_WINDOWS)),
+        ("decluster_hits", decluster_hits_chunk,
+         lambda d, e, dr, t, k: decluster_hits(d, e, dr, t, geom, k)),
+        ("hodo_mask", lambda b, k: hodo_mask_chunk(b, hodo_ids, k),
+         lambda d, e, dr, t, k: hodo_mask(d, e, geom, hodo_ids, k)),
+        ("sagitta_reducer", sagitta_reducer_chunk,
+         lambda d, e, dr, t, k: sagitta_reducer(d, e, geom, k)),
+    ]
+
+
+def write_cases(geom, chunk, workdir):
+    """
+    (name, callable) writing the reduced tree of chunk through every importable
+    backend and write mode. The input file is written and read outside the
+    timers, so each call times the writer alone (ReducedTreeWriter, which also
+    copies the non-hit branches of every entry).
+    """
+    input_file = os.path.join(workdir, "input.root")
+    write_input(input_file, chunk, "root" if have_root() else "uproot")
+    offsets = chunk["offsets"]
+    keep = reduce_chunk(chunk["detectorID"], chunk["elementID"], chunk["driftDistance"], chunk["tdcTime"],
+                        offsets, geom=geom, hodo_ids=set(HODO_IDS), **PIPELINE_FILTERS)
+
+    modes = [("uproot", "bulk")]
+    if have_root():
+        modes += [("root", "bulk"), ("root", "push_back")]
+    cases, sources = [], []
+    for backend, mode in modes:
+        source = get_backend(backend).EventSource(input_file)
+        sources.append(source)
+        chunks = list(source.iter_hit_chunks(WRITE_STEP_SIZE))
+        output_file = os.path.join(workdir, f"reduced_{backend}_{mode}.root")
+
+        def write(source=source, chunks=chunks, output_file=output_file, mode=mode):
+            writer = source.writer(output_file, write_mode=mode)
+            for entry_start, hits, chunk_offsets in chunks:
+                lo = offsets[entry_start]
+                writer.write_chunk(entry_start, hits, chunk_offsets, keep[lo:lo + chunk_offsets[-1]])
+            writer.close()
+        cases.append((f"write_{backend}_{mode}", write))
+    return cases, sources
+
+
+def sorted_events(chunk):
+    """
+    Per-event (det, elem, drift, tdc) lists, sorted like HitBatch sorts them.
+    """
+    offsets = chunk["offsets"]
+    events = []
+    for k in range(offsets.size - 1):
+        sl = slice(offsets[k], offsets[k + 1])
+        order = np.lexsort((chunk["elementID"][sl], chunk["detectorID"][sl]))
+        events.append(tuple(chunk[name][sl][order].tolist()
+                            for name in ("detectorID", "elementID", "driftDistance", "tdcTime")))
+    return events
+
+
+def reference_cases(geom, chunk):
+    """
+    (name, callable) running the original list filters event by event.
+    """
+    events = sorted_events(chunk)
+
+    def per_event(fn):
+        return lambda: [fn(det, elem, drift, tdc, list(range(len(det))))
+                        for det, elem, drift, tdc in events]
+
+    hodo_ids = set(HODO_IDS)
+    cases = [("ref_" + name, per_event(ref)) for name, _, ref in filter_pairs(geom)]
+    cases.append(("reduce_event", lambda: [reduce_event(det, drift, tdc, elem, geom=geom, hodo_ids=hodo_ids,
+                                                        **PIPELINE_FILTERS)
+                                           for det, elem, drift, tdc in events]))
+    return cases
+
+
+def check_parity(geom, chunk):
+    """
+    Runs every chunk filter and its list filter on all hits; returns the names
+    of the filters whose kept hits differ.
+    """
+    batch = HitBatch.from_chunk(chunk["detectorID"], chunk["elementID"], chunk["driftDistance"],
+                                chunk["tdcTime"], chunk["offsets"], geom=geom)
+    events = sorted_events(chunk)
+    starts = chunk["offsets"][:-1]
+    keep = np.ones(len(batch), dtype=bool)
+
+    mismatched = []
+    for name, fn, ref in filter_pairs(geom):
+        # HitBatch sorts stably by (event, det, elem), so hit i of sorted event k
+        # sits at offsets[k] + i of the batch
+        expected = np.zeros(len(batch), dtype=bool)
+        for start, (det, elem, drift, tdc) in zip(starts, events):
+            kept = ref(det, elem, drift, tdc, list(range(len(det))))
+            expected[start + np.asarray(kept, dtype=np.int64)] = True
+        if not np.array_equal(fn(batch, keep), expected):
+            mismatched.append(name)
+    return mismatched
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints new vs baseline times; returns the names slower than 1 + threshold.
+    """
+    regressions = []
+    print(f"\n{'case':>22} | {'base [ms]':>10} | {'new [ms]':>10} | {'ratio':>6}")
+    print("-" * 59)
+    for name, new in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        ratio = new["seconds"] / old["seconds"]
+        flag = ""
+        if ratio > 1.0 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:>22} | {1e3 * old['seconds']:10.2f} | {1e3 * new['seconds']:10.2f} | "
+              f"{ratio:6.2f}{flag}")
+    return regressions
+
+
+def parse_occupancy(items):
+    occupancy = dict(DEFAULT_OCCUPANCY)
+    for item in items or []:
+        region, value = item.split("=")
+        if region not in REGIONS:
+            raise SystemExit(f"Unknown region '{region}', expected one of {', '.join(REGIONS)}")
+        occupancy[region] = float(value)
+    return occupancy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tsv", default=DEFAULT_TSV, help="Geometry TSV (default: bundled param.tsv)")
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--occupancy", nargs="*", metavar="REGION=HITS",
+                        help="Mean chamber hits per event per region, e.g. D0=60 D3p=20 (default 40 each)")
+    parser.add_argument("--cluster-fraction", type=float, default=0.1)
+    parser.add_argument("--hodo-hits", type=float, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reference", action="store_true", help="Also time the per-event list filters")
+    parser.add_argument("--write", action="store_true",
+                        help="Also time the reduced-tree writers (uproot; ROOT bulk and push_back if importable)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    config = {
+        "events": args.events, "occupancy": parse_occupancy(args.occupancy),
+        "cluster_fraction": args.cluster_fraction, "hodo_hits": args.hodo_hits,
+        "seed": args.seed, "repeat": args.repeat, "tsv": os.path.basename(args.tsv),
+    }
+    geom = GeometryService(tsv_path=args.tsv)
+    chunk = make_chunk(geom, args.events, config["occupancy"], args.cluster_fraction,
+                       args.hodo_hits, args.seed)
+    n_hits = int(chunk["offsets"][-1])
+    print(f"{args.events} events, {n_hits} hits ({n_hits / args.events:.1f} per event)")
+
+    cases = chunk_cases(geom, chunk)
+    if args.reference:
+        cases += reference_cases(geom, chunk)
+    sources = []
+    workdir = tempfile.mkdtemp(prefix="run_benchmarks_")
+    if args.write:
+        extra, sources = write_cases(geom, chunk, workdir)
+        cases += extra
+
+    if args.reference:
+        mismatched = check_parity(geom, chunk)
+        print("Chunk filters match the list filters" if not mismatched else
+              f"[ERROR] Chunk filters differ from the list filters: {', '.join(mismatched)}")
+        if mismatched:
+            return 1
+
+    results = {}
+    print(f"\n{'case':>22} | {'time [ms]':>10} | {'M hits/s':>9}")
+    print("-" * 47)
+    try:
+        for name, fn in cases:
+            seconds = best_time(fn, args.repeat)
+            results[name] = {"seconds": seconds, "hits_per_s": n_hits / seconds}
+            print(f"{name:>22} | {1e3 * seconds:10.2f} | {n_hits / seconds / 1e6:9.2f}")
+    finally:
+        for source in sources:
+            source.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        meta = {
+            "commit": git_commit(), "python": platform.python_version(), "numpy": np.__version__,
+            "jit": jit_kernels.USE_JIT, "machine": platform.machine(), "n_hits": n_hits,
+        }
+        with open(args.output, "w") as f:
+            json.dump({"meta": meta, "config": config, "results": results}, f, indent=2)
+        print(f"\nWrote results to '{args.output}'")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print("[WARNING] Baseline was run with a different configuration; ratios may not be comparable.")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than baseline by more than "
+                  f"{100 * args.threshold:.0f}%: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Per-event latency of the sagitta filter against chamber hit multiplicity.
+
+Compares the original triple loop (sagitta_reducer) with the windowed array
+version (sagitta_reducer_chunk) on synthetic single-event inputs. The chunk
+version is timed with jit_kernels.USE_JIT off (NumPy) and, when Numba is
+installed, on (compiled kernel), as separate columns. Every timing starts
+with an untimed warm-up call, so JIT compilation is not counted; speedup
+is the loop time over the faster chunk column.
+
+Run from the reduce_event directory:
+    python3 -m benchmarks.sagitta_latency
+"""
+
+import argparse
+import numpy as np
+from geom.geom_service import GeometryService
+from filters import jit_kernels
+from filters.sagitta import sagitta_reducer, sagitta_reducer_chunk
+from hit_batch import HitBatch
+from benchmarks._common import DEFAULT_TSV, best_time
+
+
+def make_event(geom, n_hits, rng):
+    """
+    n_hits chamber hits spread uniformly over detectors 1-30, sorted like reduce_chunk sorts them.
+    """
+    det = rng.integers(1, 31, n_hits)
+    n_ele = np.array([geom.get_plane_n_elements(int(d)) for d in det])
+    elem = (rng.random(n_hits) * n_ele).astype(np.int64) + 1
+    order = np.lexsort((elem, det))
+    return det[order], elem[order]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tsv", default=DEFAULT_TSV, help="Geometry TSV (default: bundled param.tsv)")
+    parser.add_argument("--hits", type=int, nargs="+", default=[25, 50, 100, 200, 400, 800])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    geom = GeometryService(tsv_path=args.tsv)
+    rng = np.random.default_rng(args.seed)
+    use_jit_default = jit_kernels.USE_JIT
+
+    backends = [False, True] if jit_kernels.HAVE_NUMBA else [False]
+    print(f"{'hits':>6} | {'loop [ms]':>10} | {'numpy [ms]':>10} | "
+          + (f"{'jit [ms]':>9} | " if jit_kernels.HAVE_NUMBA else "")
+          + f"{'speedup':>8} | same")
+    print("-" * (54 + 12 * jit_kernels.HAVE_NUMBA))
+    for n_hits in args.hits:
+        det, elem = make_event(geom, n_hits, rng)
+        zeros, offsets = np.zeros(n_hits), [0, n_hits]
+        batch = lambda: HitBatch.from_chunk(det, elem, zeros, zeros, offsets, geom=geom)
+        keep = np.ones(n_hits, dtype=bool)
+        det_l, elem_l, keep_idx = det.tolist(), elem.tolist(), list(range(n_hits))
+
+        t_loop = best_time(lambda: sagitta_reducer(det_l, elem_l, geom, keep_idx), args.repeat)
+        expected = set(sagitta_reducer(det_l, elem_l, geom, keep_idx))
+
+        t_win, same = [], True
+        for use_jit in backends:
+            jit_kernels.USE_JIT = use_jit
+            t_win.append(best_time(lambda: sagitta_reducer_chunk(batch(), keep), args.repeat))
+            same &= expected == set(np.flatnonzero(sagitta_reducer_chunk(batch(), keep)).tolist())
+        jit_kernels.USE_JIT = use_jit_default
+
+        print(f"{n_hits:6d} | {1e3 * t_loop:10.2f} | "
+              + "".join(f"{1e3 * t:{10 if k == 0 else 9}.2f} | " for k, t in enumerate(t_win))
+              + f"{t_loop / min(t_win):7.1f}x | {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Synthetic hit chunks of controlled occupancy for the benchmarks.
+
+Hits are generated per region of the occupancy cut (filters.occupancy; D0:
+planes 1-6, D1: 7-12, D2: 13-18, D3p: 19-24, D3m: 25-30), with a fraction of
+them grown into adjacent-wire clusters of electronic noise, plus hodoscope
+hits. Output is a flat chunk (columns + per-event offsets) in the engine's input format.
+"""
+
+import numpy as np
+from filters.occupancy import REGIONS
+
+
+DEFAULT_OCCUPANCY = {"D0": 40, "D1": 40, "D2": 40, "D3p": 40, "D3m": 40}
+HODO_IDS = (31, 32, 37, 38, 39, 40)
+
+
+def make_chunk(geom, n_events, occupancy=DEFAULT_OCCUPANCY, cluster_fraction=0.1,
+               hodo_hits=8, seed=1):
+    """
+    Generates n_events events as one flat chunk.
+
+    Args:
+        geom (GeometryService): element counts and cell widths per plane
+        n_events (int)
+        occupancy (dict): mean chamber hits per event for each region of REGIONS
+        cluster_fraction (float): fraction of chamber hits that seed a 2-4 wire
+                                  cluster with near-equal TDC times
+        hodo_hits (float): mean hodoscope hits per event over HODO_IDS
+        seed (int)
+
+    Returns:
+        dict: detectorID, elementID, driftDistance, tdcTime and offsets arrays
+    """
+    rng = np.random.default_rng(seed)
+
+    # Per-event hit counts for every region and the hodoscopes
+    det_pools = [np.arange(lo, hi + 1) for lo, hi in REGIONS.values()]
+    det_pools.append(np.array([d for d in HODO_IDS if d in geom.detectors]))
+    means = [occupancy.get(name, 0) for name in REGIONS] + [hodo_hits]
+    counts = np.stack([rng.poisson(m, n_events) for m in means], axis=1)
+
+    # Seed hits: detector drawn uniformly inside its region
+    evt, det = [], []
+    for r, pool in enumerate(det_pools):
+        n = counts[:, r]
+        evt.append(np.repeat(np.arange(n_events), n))
+        det.append(pool[rng.integers(0, pool.size, n.sum())])
+    evt, det = np.concatenate(evt), np.concatenate(det)
+
+    n_elements = np.ones(det.max() + 1, dtype=np.int64)
+    spacing = np.ones(det.max() + 1)
+    for d in np.unique(det):
+        if int(d) in geom.detectors:
+            n_elements[d] = geom.get_plane_n_elements(int(d))
+            spacing[d] = geom.detectors[int(d)].spacing
+    elem = (rng.random(det.size) * n_elements[det]).astype(np.int64) + 1
+    tdc = rng.normal(900.0, 40.0, det.size)
+
+    # Electronic-noise clusters: extra hits on the following wires, tight in time
+    seeds = np.flatnonzero((det <= 30) & (rng.random(det.size) < cluster_fraction))
+    extra = rng.integers(1, 4, seeds.size)
+    src = np.repeat(seeds, extra)
+    step = np.arange(extra.sum()) - np.repeat(np.cumsum(extra) - extra, extra) + 1
+    c_elem = elem[src] + step
+    inside = c_elem <= n_elements[det[src]]
+    src, c_elem = src[inside], c_elem[inside]
+
+    evt = np.concatenate([evt, evt[src]])
+    det = np.concatenate([det, det[src]])
+    elem = np.concatenate([elem, c_elem])
+    tdc = np.concatenate([tdc, tdc[src] + rng.normal(0.0, 3.0, src.size)])
+    drift = rng.random(det.size) * 0.5 * spacing[det]
+
+    # Shuffle hits inside each event, as raw files are not sorted
+    order = np.lexsort((rng.random(evt.size), evt))
+    offsets = np.zeros(n_events + 1, dtype=np.int64)
+    np.cumsum(np.bincount(evt, minlength=n_events), out=offsets[1:])
+
+    return {
+        "detectorID": det[order].astype(np.int32),
+        "elementID": elem[order].astype(np.int32),
+        "driftDistance": drift[order],
+        "tdcTime": tdc[order],
+        "offsets": offsets,
+    }
@@ -0,0 +1,80 @@
+"""
+Chunk-at-a-time hit reduction engine.
+
+A chunk holds N events as flat hit columns plus per-event ``offsets`` of
+length N+1, so the hits of event ``k`` live in ``[offsets[k], offsets[k+1])``.
+The filter chain runs on the whole chunk at once and returns a boolean keep
+mask over the flat hits in their original order.
+"""
+
+import numpy as np
+from hit_batch import HitBatch
+from filters.out_of_time_removal import remove_out_of_time_hits_chunk
+from filters.decluster_hits import decluster_hits_chunk
+from filters.deduplicate_hits import deduplicate_hits_chunk
+from filters.hodo_mask import hodo_mask_chunk
+from filters.sagitta import sagitta_reducer_chunk
+from filters.occupancy import occupancy_cut_chunk, DEFAULT_MAX_HITS
+
+
+def reduce_chunk(detectorIDs, elementIDs, driftDistances, tdcTimes, offsets, **kwargs):
+    """
+    Applies the enabled filters to every event of a chunk.
+
+    Args:
+        detectorIDs, elementIDs, driftDistances, tdcTimes (array-like): flat hit columns
+        offsets (array-like): per-event hit offsets, length N+1
+        **kwargs: filter switches (occupancy, dedup, outoftime, decluster, hodomask,
+                  sagitta), plus geom, hodo_ids, tdc_windows (see load_tdc_windows),
+                  max_hits (occupancy thresholds per region), profile (a
+                  ReductionProfile that records every filter stage) and
+                  entry_start (tree entry of the first event, for the profile)
+
+    occupancy="drop" (or True) removes every hit of the events that fail the
+    occupancy cut; occupancy="flag" keeps their hits untouched. Either way the
+    rejected events skip the hit-level filters and are recorded in the profile;
+    run_reduction marks them in the output with occupancy.FLAG_BRANCH.
+
+    Returns:
+        np.ndarray[bool]: keep mask over the flat hits, in original order
+    """
+    batch = HitBatch.from_chunk(detectorIDs, elementIDs, driftDistances, tdcTimes, offsets,
+                                geom=kwargs.get("geom", None))
+    keep = np.ones(len(batch), dtype=bool)   # mask in SORTED space
+
+    # (name, filter, extra args); every filter is called as fn(batch, *args, keep)
+    stages = []
+    occupancy = kwargs.get('occupancy', False)
+    if occupancy:
+        # Event-level cut first, so rejected events cost nothing downstream
+        stages.append(("occupancy", occupancy_cut_chunk, (kwargs.get('max_hits', DEFAULT_MAX_HITS),)))
+    if kwargs.get('dedup', False):
+        stages.append(("dedup", deduplicate_hits_chunk, ()))
+    if kwargs.get('outoftime', False):
+        # Cheap cut; runs before decluster/sagitta so they see fewer hits
+        if kwargs.get('tdc_windows') is None:
+            raise ValueError("outoftime=True requires tdc_windows=load_tdc_windows(<path to TDC window TSV>)")
+        stages.append(("outoftime", remove_out_of_time_hits_chunk, (kwargs['tdc_windows'],)))
+    if kwargs.get('decluster', False):
+        stages.append(("decluster", decluster_hits_chunk, ()))
+    if kwargs.get('hodomask', False):
+        stages.append(("hodomask", hodo_mask_chunk, (kwargs.get('hodo_ids', set()),)))
+    if kwargs.get('sagitta', False):
+        stages.append(("sagitta", sagitta_reducer_chunk, ()))
+
+    profile = kwargs.get('profile', None)
+    for name, fn, args in stages:
+        if profile is None:
+            keep = fn(batch, *args, keep)
+        else:
+            keep = profile.run_filter(name, fn, batch, keep, *args)
+        if name == "occupancy":
+            rejected = ~keep   # every hit of a rejected event, nothing else
+
+    if occupancy:
+        if profile is not None:
+            profile.record_rejected(kwargs.get('entry_start', 0) + np.unique(batch.evt[rejected]))
+        if occupancy == "flag":
+            keep |= rejected
+
+    return batch.to_original(keep)
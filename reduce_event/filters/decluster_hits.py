@@ -1,5 +1,6 @@
 import numpy as np
 from reco_constants import N_CHAMBER_PLANES
+from filters import jit_kernels
 
 # Set this to True only if you want to "fix" the C++ quirk.
 _FLUSH_FINAL_CLUSTER = False
@@ -105,4 +106,94 @@ def decluster_hits(detectorIDs, elementIDs, driftDistances, tdcTimes, geom, keep
 
     return result
 
- 
+
+def decluster_hits_chunk(batch, keep):
+    """
+    Array version of decluster_hits for a whole chunk.
+
+    Expects hits sorted by (event, detectorID, elementID). Clusters are runs of
+    kept chamber hits in the same event and detector with element steps <= 1;
+    cluster size and mean adjacent |ΔTDC| come from segmented reductions, and
+    the 2-hit and >=3-hit rules are applied as masks. The C++ quirks carry over:
+    hits past N_CHAMBER_PLANES are never touched, and the last chamber cluster
+    of every event is kept unprocessed unless _FLUSH_FINAL_CLUSTER is set.
+    With Numba available the cluster loop runs in jit_kernels.decluster_kernel.
+
+    Args:
+        batch (HitBatch): sorted hits of the chunk (uses wire_pos for 2-hit clusters)
+        keep (np.ndarray[bool]): mask from previous filters
+
+    Returns:
+        np.ndarray[bool]: updated keep mask
+    """
+    evt, detectorIDs, elementIDs = batch.evt, batch.det, batch.elem
+    driftDistances, tdcTimes = batch.drift, batch.tdc
+    new_keep = keep.copy()
+
+    idx = np.flatnonzero(keep)
+    idx = idx[detectorIDs[idx] <= N_CHAMBER_PLANES]
+    if idx.size == 0:
+        return new_keep
+
+    if jit_kernels.USE_JIT:
+        drop = jit_kernels.decluster_kernel(idx, evt, detectorIDs, elementIDs, driftDistances,
+                                            tdcTimes, batch.wire_pos, _FLUSH_FINAL_CLUSTER)
+        new_keep[idx[drop]] = False
+        return new_keep
+
+    e, d, el = evt[idx], detectorIDs[idx], elementIDs[idx]
+
+    # Cluster breaks: new event, new detector or an element gap > 1
+    brk = np.ones(idx.size, dtype=bool)
+    brk[1:] = (e[1:] != e[:-1]) | (d[1:] != d[:-1]) | ((el[1:] - el[:-1]) > 1)
+    starts = np.flatnonzero(brk)
+    size = np.diff(np.append(starts, idx.size))
+
+    process = size >= 2
+    if not _FLUSH_FINAL_CLUSTER:
+        cl_evt = e[starts]
+        last_in_event = np.append(cl_evt[1:] != cl_evt[:-1], True)
+        process &= ~last_in_event
+
+    drop = np.zeros(idx.size, dtype=bool)
+
+    # --- 2-hit clusters: DRIFT rule first, then D3p timing rule ---
+    pair = starts[process & (size == 2)]
+    if pair.size:
+        i0, i1 = idx[pair], idx[pair + 1]
+        pos0, pos1 = batch.wire_pos[i0], batch.wire_pos[i1]
+        w_max = 0.9 * 0.5 * (pos1 - pos0)
+        w_min = (w_max / 9.0) * 4.0
+
+        drift0, drift1 = driftDistances[i0], driftDistances[i1]
+        drift_rule = ((drift0 > w_max) & (drift1 > w_min)) | ((drift1 > w_max) & (drift0 > w_min))
+        keep_front = drift0 <= drift1   # ties keep the front hit
+
+        det0 = detectorIDs[i0]
+        timing_rule = (~drift_rule & (det0 >= 19) & (det0 <= 24)
+                       & (np.abs(tdcTimes[i0] - tdcTimes[i1]) < 8.0))
+
+        drop[pair] = (drift_rule & ~keep_front) | timing_rule
+        drop[pair + 1] = (drift_rule & keep_front) | timing_rule
+
+    # --- >=3-hit clusters: mean adjacent ΔTDC; drop all if <10, else keep ends ---
+    multi = process & (size >= 3)
+    if multi.any():
+        m_start, m_size = starts[multi], size[multi]
+
+        # Gather each cluster's adjacent |ΔTDC| into one contiguous segment
+        abs_dt = np.abs(np.diff(tdcTimes[idx]))
+        n_dt = m_size - 1
+        seg_start = np.zeros(n_dt.size, dtype=np.int64)
+        np.cumsum(n_dt[:-1], out=seg_start[1:])
+        gather = np.repeat(m_start - seg_start, n_dt) + np.arange(n_dt.sum())
+        dt_mean = np.add.reduceat(abs_dt[gather], seg_start) / n_dt
+
+        # Position (in idx) of every member, and whether it is a cluster end
+        rank = np.arange(m_size.sum()) - np.repeat(np.cumsum(m_size) - m_size, m_size)
+        member = np.repeat(m_start, m_size) + rank
+        is_end = (rank == 0) | (rank == np.repeat(m_size - 1, m_size))
+        drop[member] = np.repeat(dt_mean < 10.0, m_size) | ~is_end
+
+    new_keep[idx[drop]] = False
+    return new_keep
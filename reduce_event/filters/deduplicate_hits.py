@@ -1,3 +1,5 @@
+import numpy as np
+
 def deduplicate_hits(detectorIDs, elementIDs, keep_idx):
     """
     Remove duplicate hits based on (detectorID, elementID) pairs.
@@ -19,3 +21,31 @@ def deduplicate_hits(detectorIDs, elementIDs, keep_idx):
             seen.add(key)
             result.append(i)
     return result
+
+
+def deduplicate_hits_chunk(batch, keep):
+    """
+    Chunk version of deduplicate_hits.
+
+    Works on the packed hit UID (detectorID * 1000 + elementID, as in hodo_mask)
+    with the event index in the high 32 bits of the key, so one comparison
+    separates both events and wires. Expects hits sorted by (event, detectorID,
+    elementID); duplicates are then adjacent among the kept hits and only the
+    first hit of every run of equal keys survives.
+
+    Args:
+        batch (HitBatch): sorted hits of the chunk (uses evt and uid)
+        keep (np.ndarray[bool]): mask from previous filters
+
+    Returns:
+        np.ndarray[bool]: updated keep mask
+    """
+    idx = np.flatnonzero(keep)
+    key = (batch.evt[idx].astype(np.int64) << 32) | batch.uid[idx].astype(np.int64)
+
+    first = np.ones(idx.size, dtype=bool)
+    first[1:] = key[1:] != key[:-1]
+
+    new_keep = keep.copy()
+    new_keep[idx[~first]] = False
+    return new_keep
@@ -1,5 +1,5 @@
 # filters/hodo_mask.py
-from geom.geom_service import GeometryService
+import numpy as np
 
 def extract_hodo_hits(detectorIDs, elementIDs, hodo_ids, keep_idx):
     """
@@ -48,4 +48,56 @@ def hodo_mask(detectorIDs, elementIDs, geom, hodo_ids, keep_idx):
         list[int]: indices to keep after hodo masking
     """
     hodo_uids = extract_hodo_hits(detectorIDs, elementIDs, hodo_ids, keep_idx)
-    return apply_hodo_mask(detectorIDs, elementIDs, hodo_uids, geom.c2h, keep_idx)
\ No newline at end of file
+    return apply_hodo_mask(detectorIDs, elementIDs, hodo_uids, geom.c2h, keep_idx)
+
+
+def hodo_mask_chunk(batch, hodo_ids, keep):
+    """
+    Bitset version of hodo_mask for a whole chunk.
+
+    Builds one hodo bitmask per event from its kept hodo hits (bit layout from
+    geom.hodo_uid_col), then keeps a chamber hit only if its row in
+    geom.c2h_bits shares a bit with its event's mask. Chamber UIDs with no LUT
+    entry are dropped; hits with detectorID > 30 always pass.
+
+    Args:
+        batch (HitBatch): sorted hits of the chunk (uses uid and geom)
+        hodo_ids (set[int]): hodoscope detectorIDs
+        keep (np.ndarray[bool]): mask from previous filters
+
+    Returns:
+        np.ndarray[bool]: updated keep mask
+    """
+    new_keep = keep.copy()
+
+    idx = np.flatnonzero(keep)
+    if idx.size == 0:
+        return new_keep
+
+    e, det, uid = batch.evt[idx], batch.det[idx], batch.uid[idx]
+
+    c2h_bits, hodo_uid_col = batch.geom.c2h_bits, batch.geom.hodo_uid_col
+    n_events = batch.n_events
+
+    # One hodo bitmask per event
+    is_hodo = np.isin(det, np.fromiter(hodo_ids, dtype=np.int64))
+    h_evt, h_uid = e[is_hodo], uid[is_hodo]
+    known = (h_uid >= 0) & (h_uid < hodo_uid_col.size)
+    col = np.full(h_uid.size, -1, dtype=np.int64)
+    col[known] = hodo_uid_col[h_uid[known]]
+    known = col >= 0
+
+    event_bits = np.zeros((n_events, c2h_bits.shape[1]), dtype=np.uint64)
+    np.bitwise_or.at(event_bits, (h_evt[known], col[known] // 64),
+                     np.left_shift(np.uint64(1), (col[known] % 64).astype(np.uint64)))
+
+    # Chamber hits: one gather of LUT rows and event masks, then AND
+    is_cham = det <= 30
+    c_idx, c_evt, c_uid = idx[is_cham], e[is_cham], uid[is_cham]
+    in_lut = (c_uid >= 0) & (c_uid < c2h_bits.shape[0])
+
+    overlap = np.zeros(c_uid.size, dtype=bool)
+    overlap[in_lut] = (c2h_bits[c_uid[in_lut]] & event_bits[c_evt[in_lut]]).any(axis=1)
+
+    new_keep[c_idx[~overlap]] = False
+    return new_keep
@@ -0,0 +1,149 @@
+"""
+Optional Numba kernels for the sequential parts of the chunk filters.
+
+The cluster state machine of decluster_hits and the triplet matching of
+sagitta_reducer are written here as plain loops over the flat, sorted hit
+arrays of a chunk. When Numba is importable they are compiled with njit and
+decluster_hits_chunk / sagitta_reducer_chunk dispatch to them; otherwise
+USE_JIT is False and the NumPy implementations are used. Set USE_JIT = False
+(or KTRACKER_NO_JIT=1 in the environment) to force the NumPy path.
+"""
+
+import os
+import numpy as np
+from reco_constants import (
+    Z_TARGET, Z_DUMP,
+    SAGITTA_TARGET_CENTER, SAGITTA_DUMP_CENTER,
+    SAGITTA_TARGET_WIDTH, SAGITTA_DUMP_WIDTH,
+    TX_MAX
+)
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        # Without Numba the kernels stay plain Python functions
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+USE_JIT = HAVE_NUMBA and not os.environ.get("KTRACKER_NO_JIT")
+
+
+@njit(cache=True)
+def decluster_kernel(idx, evt, det, elem, drift, tdc, wire_pos, flush_final):
+    """
+    Cluster state machine over the kept chamber hits idx of a sorted chunk,
+    with the C++ processCluster rules applied to each closed cluster.
+
+    Returns:
+        np.ndarray[bool]: drop flag for every entry of idx
+    """
+    n = idx.size
+    drop = np.zeros(n, dtype=np.bool_)
+    start = 0
+    for k in range(1, n + 1):
+        last_in_event = True
+        if k < n:
+            a, b = idx[k - 1], idx[k]
+            if evt[b] == evt[a] and det[b] == det[a] and elem[b] - elem[a] <= 1:
+                continue
+            last_in_event = evt[b] != evt[a]
+
+        m = k - start
+        # The C++ loop never processes the cluster pending at the end of an event
+        if m >= 2 and (flush_final or not last_in_event):
+            if m == 2:
+                i0, i1 = idx[start], idx[start + 1]
+                w_max = 0.9 * 0.5 * (wire_pos[i1] - wire_pos[i0])
+                w_min = (w_max / 9.0) * 4.0
+                drift0, drift1 = drift[i0], drift[i1]
+
+                # DRIFT rule first — keep the smaller drift, ties keep the front hit
+                if (drift0 > w_max and drift1 > w_min) or (drift1 > w_max and drift0 > w_min):
+                    if drift0 <= drift1:
+                        drop[start + 1] = True
+                    else:
+                        drop[start] = True
+                # D3p timing rule — drop both
+                elif 19 <= det[i0] <= 24 and abs(tdc[i0] - tdc[i1]) < 8.0:
+                    drop[start] = True
+                    drop[start + 1] = True
+            else:
+                # Mean adjacent ΔTDC; drop all if < 10, else keep the ends
+                dt_sum = 0.0
+                for j in range(start + 1, k):
+                    dt_sum += abs(tdc[idx[j]] - tdc[idx[j - 1]])
+                electric_noise = dt_sum / (m - 1) < 10.0
+                for j in range(start, k):
+                    if electric_noise or (j != start and j != k - 1):
+                        drop[j] = True
+        start = k
+    return drop
+
+
+@njit(cache=True)
+def sagitta_kernel(evt, det, pos, z, ptype):
+    """
+    Triplet matching of sagitta_reducer, event by event.
+
+    Takes the candidate chamber hits of a chunk sorted by (event, detectorID)
+    and returns True for every hit that belongs to an accepted (D3, D2, D1)
+    triplet. The arithmetic follows sagitta_reducer term by term.
+    """
+    n = evt.size
+    survive = np.zeros(n, dtype=np.bool_)
+    lo = 0
+    while lo < n:
+        hi = lo
+        while hi < n and evt[hi] == evt[lo]:
+            hi += 1
+
+        # Sorted by detectorID, so D1 | D2 | D3 are consecutive runs
+        b2 = lo
+        while b2 < hi and det[b2] <= 12:
+            b2 += 1
+        b3 = b2
+        while b3 < hi and det[b3] <= 18:
+            b3 += 1
+
+        for i3 in range(b3, hi):
+            pos3, z3 = pos[i3], z[i3]
+            slope_target = pos3 / (z3 - Z_TARGET)
+            slope_dump   = pos3 / (z3 - Z_DUMP)
+
+            for i2 in range(b2, b3):
+                if ptype[i3] != ptype[i2]:
+                    continue
+                pos2, z2 = pos[i2], z[i2]
+                if abs((pos3 - pos2) / (z2 - z3)) > TX_MAX:
+                    continue
+
+                s2_target = pos2 - slope_target * (z2 - Z_TARGET)
+                s2_dump   = pos2 - slope_dump   * (z2 - Z_DUMP)
+
+                for i1 in range(lo, b2):
+                    if ptype[i3] != ptype[i1]:
+                        continue
+                    if survive[i3] and survive[i2] and survive[i1]:
+                        continue
+                    z1 = z[i1]
+
+                    pos_exp_target = SAGITTA_TARGET_CENTER * s2_target + slope_target * (z1 - Z_TARGET)
+                    pos_exp_dump   = SAGITTA_DUMP_CENTER   * s2_dump   + slope_dump   * (z1 - Z_DUMP)
+
+                    win_target = abs(s2_target * SAGITTA_TARGET_WIDTH)
+                    win_dump   = abs(s2_dump   * SAGITTA_DUMP_WIDTH)
+
+                    p_min = min(pos_exp_target - win_target, pos_exp_dump - win_dump)
+                    p_max = max(pos_exp_target + win_target, pos_exp_dump + win_dump)
+
+                    if p_min < pos[i1] < p_max:
+                        survive[i3] = True
+                        survive[i2] = True
+                        survive[i1] = True
+        lo = hi
+    return survive
@@ -0,0 +1,97 @@
+"""
+Occupancy Cut (accept_event)
+
+An event is rejected when any chamber region holds more hits than its
+max_hits threshold. Region counts of a whole chunk come from one np.bincount
+over (event, region) pairs, using a detectorID -> region lookup table.
+"""
+
+import numpy as np
+
+# Chamber planes (detectorID, inclusive) of each occupancy region
+REGIONS = {
+    "D0":  (1, 6),
+    "D1":  (7, 12),
+    "D2":  (13, 18),
+    "D3p": (19, 24),
+    "D3m": (25, 30),
+}
+DEFAULT_MAX_HITS = {"D0": 40, "D1": 40, "D2": 40, "D3p": 40, "D3m": 40}
+# Per-event output branch, True for the events that failed the cut
+FLAG_BRANCH = "occupancyRejected"
+
+# Region index of every detectorID; non-chamber detectors go to the extra
+# last bin, which is never cut on
+N_REGIONS = len(REGIONS)
+DETECTOR_REGION = np.full(max(hi for _, hi in REGIONS.values()) + 1, N_REGIONS, dtype=np.int64)
+for _r, (_lo, _hi) in enumerate(REGIONS.values()):
+    DETECTOR_REGION[_lo:_hi + 1] = _r
+
+
+def _region_of(detectorIDs):
+    det = np.asarray(detectorIDs, dtype=np.int64)
+    in_table = (det >= 0) & (det < DETECTOR_REGION.size)
+    return np.where(in_table, DETECTOR_REGION[np.where(in_table, det, 0)], N_REGIONS)
+
+
+def _thresholds(max_hits):
+    return np.array([max_hits[name] for name in REGIONS])
+
+
+def region_counts(evt, detectorIDs, n_events):
+    """
+    Hits per event and region.
+
+    Args:
+        evt (array-like): event index of every hit, in [0, n_events)
+        detectorIDs (array-like): detectorID of every hit
+        n_events (int)
+
+    Returns:
+        np.ndarray: (n_events, len(REGIONS)) hit counts, regions in REGIONS order
+    """
+    flat = np.asarray(evt, dtype=np.int64) * (N_REGIONS + 1) + _region_of(detectorIDs)
+    counts = np.bincount(flat, minlength=n_events * (N_REGIONS + 1))
+    return counts.reshape(n_events, N_REGIONS + 1)[:, :N_REGIONS]
+
+
+def accept_events_chunk(detectorIDs, offsets, max_hits=DEFAULT_MAX_HITS):
+    """
+    Occupancy cut on every event of a chunk.
+
+    Args:
+        detectorIDs (array-like): flat detectorID column
+        offsets (array-like): per-event hit offsets, length N+1
+        max_hits (dict): max allowed hits per region (D0-D3m)
+
+    Returns:
+        np.ndarray[bool]: per event, True if it passes all occupancy cuts
+    """
+    offsets = np.asarray(offsets)
+    n_events = offsets.size - 1
+    evt = np.repeat(np.arange(n_events), np.diff(offsets))
+    counts = region_counts(evt, detectorIDs, n_events)
+    return np.all(counts <= _thresholds(max_hits), axis=1)
+
+
+def occupancy_cut_chunk(batch, max_hits, keep):
+    """
+    Drops every hit of the events that fail the occupancy cut.
+
+    Only hits still in keep are counted, so the cut sees the same hits
+    wherever it runs in the chain; the engine runs it first.
+    """
+    kept = np.flatnonzero(keep)
+    counts = region_counts(batch.evt[kept], batch.det[kept], batch.n_events)
+    accepted = np.all(counts <= _thresholds(max_hits), axis=1)
+    return keep & accepted[batch.evt]
+
+
+def rejected_events(hits, offsets, max_hits=DEFAULT_MAX_HITS):
+    """
+    FLAG_BRANCH column of a chunk: True for every event that fails the cut.
+
+    Computed from the input detectorIDs, which is what the engine's first
+    stage sees, so writers can fill it without the engine's keep mask.
+    """
+    return ~accept_events_chunk(hits["detectorID"], offsets, max_hits)
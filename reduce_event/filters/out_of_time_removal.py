@@ -4,17 +4,80 @@ Out-of-Time Hit Removal Filter
 
 import numpy as np
 
-def remove_out_of_time_hits(tdc_times, keep_idx):
+
+def load_tdc_windows(tsv_path):
+    """
+    Loads per-detector TDC windows (center ± width/2) from a calibration TSV
+    with columns detectorID, center, width (extra columns are ignored), as
+    written by scripts/tdctime_histogram/gaussian_fit.py.
+
+    Returns:
+        (lower, upper): float arrays indexed by detectorID. Detectors without a
+        calibration row get (-inf, +inf), i.e. their hits are never cut.
+
+    Raises:
+        ValueError: if a detectorID is negative or not an integer
+    """
+    import pandas as pd
+    df = pd.read_csv(tsv_path, sep='\t', comment='#', header=None,
+                     usecols=[0, 1, 2], names=["detectorID", "center", "width"])
+
+    # Detector IDs index the window arrays, so they must be non-negative integers
+    raw_ids = pd.to_numeric(df["detectorID"], errors="coerce").to_numpy(dtype=float)
+    bad = ~np.isfinite(raw_ids) | (raw_ids < 0) | (raw_ids != np.floor(raw_ids))
+    if bad.any():
+        row = int(np.flatnonzero(bad)[0])
+        raise ValueError(f"Invalid detectorID '{df['detectorID'].iloc[row]}' in {tsv_path} "
+                         f"(data row {row + 1}); expected a non-negative integer")
+    det_ids = raw_ids.astype(np.int64)
+    size = int(det_ids.max()) + 1 if det_ids.size else 0
+    lower = np.full(size, -np.inf)
+    upper = np.full(size, np.inf)
+
+    center = df["center"].to_numpy(dtype=float)
+    width = df["width"].to_numpy(dtype=float)
+    lower[det_ids] = center - (width / 2)
+    upper[det_ids] = center + (width / 2)
+    return lower, upper
+
+
+def remove_out_of_time_hits(tdc_times, keep_idx, detectorIDs=None, tdc_windows=None):
     """
-    Filters hits based on TDC center and width.
+    Filters hits based on the TDC center and width of their detector.
     Args:
         tdc_times (list): Full array of TDC times
         keep_idx (list): List of indices to check and filter
+        detectorIDs (list): Full array of detector IDs
+        tdc_windows (tuple): (lower, upper) arrays from load_tdc_windows
+    Returns:
+        list: Updated keep_idx; unchanged when no detectorIDs/tdc_windows are
+        given, as before the calibration was loaded
+    """
+    if detectorIDs is None or tdc_windows is None:
+        return keep_idx
+    lower, upper = tdc_windows
+    result = []
+    for i in keep_idx:
+        det = detectorIDs[i]
+        if det < 0 or det >= len(lower) or lower[det] <= tdc_times[i] <= upper[det]:
+            result.append(i)
+    return result
+
+
+def remove_out_of_time_hits_chunk(batch, tdc_windows, keep):
+    """
+    Vectorized remove_out_of_time_hits: one window lookup and comparison for the whole chunk.
+    Args:
+        batch (HitBatch): sorted hits of the chunk (uses det and tdc)
+        tdc_windows (tuple): (lower, upper) arrays from load_tdc_windows
+        keep (np.ndarray[bool]): mask from previous filters
     Returns:
-        list: Updated keep_idx
+        np.ndarray[bool]: Updated keep mask
     """
-    # lower = tdc_center - (tdc_width / 2)
-    # upper = tdc_center + (tdc_width / 2)
+    detectorIDs, tdcTimes = batch.det, batch.tdc
+    lower, upper = tdc_windows
+    calibrated = (detectorIDs >= 0) & (detectorIDs < lower.size)
+    det = np.where(calibrated, detectorIDs, 0)
 
-    # return [i for i in keep_idx if lower <= tdc_times[i] <= upper]
-    return keep_idx
+    in_time = (lower[det] <= tdcTimes) & (tdcTimes <= upper[det])
+    return keep & (~calibrated | in_time)
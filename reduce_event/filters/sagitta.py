@@ -1,9 +1,11 @@
+import numpy as np
 from reco_constants import (
     Z_TARGET, Z_DUMP,
     SAGITTA_TARGET_CENTER, SAGITTA_DUMP_CENTER,
     SAGITTA_TARGET_WIDTH, SAGITTA_DUMP_WIDTH,
     TX_MAX
 )
+from filters import jit_kernels
 
 def sagitta_reducer(detectorIDs, elementIDs, geom, keep_idx):
     """
@@ -81,4 +83,137 @@ def sagitta_reducer(detectorIDs, elementIDs, geom, keep_idx):
                             seen.add(idx)
                             new_keep_idx.append(idx)
                           
-    return new_keep_idx
\ No newline at end of file
+    return new_keep_idx
+
+
+def _window_ranks(seg, pos, q_seg, q_lo, q_hi):
+    """
+    For data sorted by (seg, pos), returns for every query the rank range
+    [r_lo, r_hi) of the data points with seg == q_seg and q_lo < pos < q_hi.
+
+    Both ranks are lexicographic searchsorted results, computed by merging
+    the queries into the data with one lexsort (strict bounds on both sides).
+    """
+    n_data, n_q = seg.size, q_seg.size
+
+    def rank(q_val, data_first):
+        # Tie rule: data before query gives searchsorted 'right', after gives 'left'
+        keys_seg = np.concatenate([seg, q_seg])
+        keys_val = np.concatenate([pos, q_val])
+        tie = np.concatenate([np.full(n_data, 0 if data_first else 1),
+                              np.full(n_q, 1 if data_first else 0)])
+        order = np.lexsort((tie, keys_val, keys_seg))
+        n_data_before = np.cumsum(order < n_data) - (order < n_data)
+        ranks = np.empty(n_q, dtype=np.int64)
+        is_q = order >= n_data
+        ranks[order[is_q] - n_data] = n_data_before[is_q]
+        return ranks
+
+    return rank(q_lo, True), rank(q_hi, False)
+
+
+def sagitta_reducer_chunk(batch, keep):
+    """
+    Windowed version of sagitta_reducer for a whole chunk; same kept set.
+
+    A hit survives if it belongs to at least one accepted (D3, D2, D1) triplet.
+    D3×D2 pairs of the same plane type are enumerated per event and cut on
+    TX_MAX; for every pair and every D1 plane of that type the allowed
+    (p_min, p_max) window is resolved by binary search over that plane's hits
+    sorted by position, instead of scanning all D1 hits. With Numba available
+    the per-event triplet loop of jit_kernels.sagitta_kernel is used instead.
+
+    Args:
+        batch (HitBatch): sorted hits of the chunk (uses wire_pos, z and ptype)
+        keep (np.ndarray[bool]): mask from previous filters
+
+    Returns:
+        np.ndarray[bool]: updated keep mask
+    """
+    geom = batch.geom
+    new_keep = keep.copy()
+
+    idx = np.flatnonzero(keep & (batch.det <= 30))
+    new_keep[idx] = False   # chamber hits must earn their place in a triplet
+    idx = idx[batch.in_geom[idx]]
+    if idx.size == 0:
+        return new_keep
+
+    e, d = batch.evt[idx].astype(np.int64), batch.det[idx].astype(np.int64)
+    pos, z, ptype = batch.wire_pos[idx], batch.z[idx], batch.ptype[idx]
+
+    if jit_kernels.USE_JIT:
+        new_keep[idx[jit_kernels.sagitta_kernel(e, d, pos, z, ptype)]] = True
+        return new_keep
+
+    i1 = np.flatnonzero(d <= 12)
+    i2 = np.flatnonzero((d > 12) & (d <= 18))
+    i3 = np.flatnonzero(d > 18)
+    if not (i1.size and i2.size and i3.size):
+        return new_keep
+
+    # --- D3×D2 pairs sharing (event, plane type) ---
+    g2 = e[i2] * 16 + (ptype[i2] + 1)                # group key; plane types are -1..4
+    o2 = np.lexsort((i2, g2))
+    i2, g2 = i2[o2], g2[o2]
+    g3 = e[i3] * 16 + (ptype[i3] + 1)
+    lo = np.searchsorted(g2, g3, side='left')
+    n_match = np.searchsorted(g2, g3, side='right') - lo
+
+    p3 = np.repeat(i3, n_match)
+    p2 = i2[np.repeat(lo, n_match) + np.arange(n_match.sum())
+            - np.repeat(np.cumsum(n_match) - n_match, n_match)]
+
+    pos3, z3, pos2, z2 = pos[p3], z[p3], pos[p2], z[p2]
+    tx_ok = ~(np.abs((pos3 - pos2) / (z2 - z3)) > TX_MAX)
+    p3, p2, pos3, z3, pos2, z2 = p3[tx_ok], p2[tx_ok], pos3[tx_ok], z3[tx_ok], pos2[tx_ok], z2[tx_ok]
+    if p3.size == 0:
+        return new_keep
+
+    slope_target = pos3 / (z3 - Z_TARGET)
+    slope_dump   = pos3 / (z3 - Z_DUMP)
+    s2_target = pos2 - slope_target * (z2 - Z_TARGET)
+    s2_dump   = pos2 - slope_dump   * (z2 - Z_DUMP)
+    win_target = np.abs(s2_target * SAGITTA_TARGET_WIDTH)
+    win_dump   = np.abs(s2_dump   * SAGITTA_DUMP_WIDTH)
+
+    # --- One window query per (pair, D1 plane of the same type) ---
+    d1_planes = {}
+    for det_id in np.flatnonzero(geom.det_known[:13]).tolist():
+        d1_planes.setdefault(int(geom.plane_type[det_id]), []).append(det_id)
+
+    q_pair, q_det, z1 = [], [], []
+    pair_type = ptype[p3]
+    for plane_type, dets in d1_planes.items():
+        pairs = np.flatnonzero(pair_type == plane_type)
+        for det_id in dets:
+            q_pair.append(pairs)
+            q_det.append(np.full(pairs.size, det_id, dtype=np.int64))
+            z1.append(np.full(pairs.size, geom.z0[det_id]))
+    if not q_pair:
+        return new_keep
+    q_pair, q_det, z1 = np.concatenate(q_pair), np.concatenate(q_det), np.concatenate(z1)
+
+    st, sd = slope_target[q_pair], slope_dump[q_pair]
+    pos_exp_target = SAGITTA_TARGET_CENTER * s2_target[q_pair] + st * (z1 - Z_TARGET)
+    pos_exp_dump   = SAGITTA_DUMP_CENTER   * s2_dump[q_pair]   + sd * (z1 - Z_DUMP)
+    wt, wd = win_target[q_pair], win_dump[q_pair]
+    p_min = np.minimum(pos_exp_target - wt, pos_exp_dump - wd)
+    p_max = np.maximum(pos_exp_target + wt, pos_exp_dump + wd)
+
+    # D1 hits sorted by (event, plane, position)
+    seg1 = e[i1] * 1000 + d[i1]
+    o1 = np.lexsort((pos[i1], seg1))
+    i1, seg1 = i1[o1], seg1[o1]
+    q_seg = e[p3[q_pair]] * 1000 + q_det
+
+    r_lo, r_hi = _window_ranks(seg1, pos[i1], q_seg, p_min, p_max)
+    hit = r_lo < r_hi
+
+    # Every D1 hit inside at least one accepted window survives
+    cover = (np.bincount(r_lo[hit], minlength=i1.size + 1)
+             - np.bincount(r_hi[hit], minlength=i1.size + 1))
+    survivors = [i1[np.cumsum(cover[:-1]) > 0], p3[q_pair[hit]], p2[q_pair[hit]]]
+
+    new_keep[idx[np.concatenate(survivors)]] = True
+    return new_keep
@@ -1,11 +1,32 @@
 # geom/geom_service.py
 
-import pandas as pd
+import numpy as np
 import math
 import bisect
+import hashlib
+import os
+import tempfile
 from collections import defaultdict
+from geom.geom_tables import (
+    GeometryTables, WIRE_MID, WIRE_SPACING, WIRE_XOFFSET, WIRE_X0COS, WIRE_Y0SIN, WIRE_DELTA_W
+)
 from reduce_event.reco_constants import N_CHAMBER_PLANES, N_HODO_PLANES, N_PROP_PLANES, TX_MAX, TY_MAX, BUFFER
 
+# The compiled geometry (planes, dense tables and hodo-mask LUTs) is cached
+# here, keyed by the TSV contents and the LUT parameters; set
+# KTRACKER_GEOM_CACHE to move it, or pass cache_dir=None. When the home
+# directory is not writable the cache goes to the system temp directory.
+DEFAULT_LUT_CACHE_DIR = os.environ.get(
+    "KTRACKER_GEOM_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "ktracker", "geom"))
+FALLBACK_LUT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ktracker-geom")
+LUT_CACHE_VERSION = 2  # bump when the LUT construction or the cached tables change
+
+# TSV columns passed to Plane, stored per plane in the cache
+PLANE_PARAMS = ("n_ele", "cell_spacing", "cell_width", "angle_from_vert", "xoffset",
+                "height", "x0", "y0", "z0", "theta_x", "theta_y", "theta_z")
+# Dense tables of build_tables, stored as they are
+TABLE_NAMES = ("det_known", "z0", "plane_type", "n_elements", "wire_pos", "wire_coef")
+
 CHAM_LUT_MAP = {
     31: [1, 2, 3, 4, 5, 6],        # H1B → D0U, D0Up, D0X, D0Xp, D0V, D0Vp
     32: [1, 2, 3, 4, 5, 6],        # H1T → same as above
@@ -220,13 +241,32 @@ class Plane:
         return x_min, x_max, y_min, y_max
 
 
-class GeometryService:
-    def __init__(self, tsv_path: str):
+class _Row:
+    """
+    Attribute access to a cached plane row, like the TSV rows of itertuples.
+    """
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+
+class GeometryService(GeometryTables):
+    def __init__(self, tsv_path: str, cache_dir=DEFAULT_LUT_CACHE_DIR):
         self.detectors = {}  # detectorID -> Plane instance
         self.c2h = {}        # chamberUID -> list of masking hodoUIDs
         self.h2celementID_lo = defaultdict(list)
         self.h2celementID_hi = defaultdict(list)
         self.c2helementIDs = defaultdict(list)
+        self.hodo_paddle_uids = np.empty(0, dtype=np.int64)    # bit k -> hodo UID
+        self.hodo_uid_col = np.empty(0, dtype=np.int64)        # hodo UID -> bit k (-1 if none)
+        self.c2h_bits = np.zeros((0, 1), dtype=np.uint64)      # chamberUID -> packed hodo bits
+        # Dense per-detectorID tables, filled by build_tables()
+        self.det_known = np.zeros(0, dtype=bool)               # detectorID in the geometry
+        self.z0 = np.empty(0)                                  # plane z (NaN if unknown)
+        self.plane_type = np.empty(0, dtype=np.int64)          # planeType (0 if unknown)
+        self.n_elements = np.empty(0, dtype=np.int64)          # element count (0 if unknown)
+        self.wire_pos = np.empty((0, 0))                       # [det, elem] wire position, NaN padded
+        self.wire_coef = np.empty((0, 6))                      # [det, :] get_wire_position terms
         self.CHAM_LUT_MAP = {
             31: [1, 2, 3, 4, 5, 6],
             32: [1, 2, 3, 4, 5, 6],
@@ -238,9 +278,39 @@ class GeometryService:
             47: [],
         }
         self.tsv_path = tsv_path
-        self.load_geometry_from_tsv()
+        self.cache_dir = cache_dir
+        if not self.load_lut_cache():
+            self.load_geometry_from_tsv()
+            self.save_lut_cache()
+
+    def add_plane(self, det_id, det_name, row):
+        """
+        Adds the Plane of one geometry row (anything with the PLANE_PARAMS attributes).
+        """
+        self.detectors[det_id] = Plane(
+            detector_id=det_id,
+            detector_name=det_name,
+            x0=row.x0,
+            y0=row.y0,
+            z0=row.z0,
+            height=row.height,
+            n_elements=row.n_ele,
+            spacing=row.cell_spacing,
+            cell_width=row.cell_width,
+            angle_from_vert=row.angle_from_vert,
+            xoffset=row.xoffset,
+            theta_x=row.theta_x,
+            theta_y=row.theta_y,
+            theta_z=row.theta_z,
+            delta_w=0.0   # Assuming deltaW is not provided in the TSV, set to 0.0 
+        )
 
     def load_geometry_from_tsv(self):
+        """
+        Parses the TSV and builds the planes, dense tables and hodo-mask LUTs.
+        Only runs on a cache miss; pandas is imported here for that reason.
+        """
+        import pandas as pd
         columns = [
             "det_name", "n_ele", "cell_spacing", "cell_width", "angle_from_vert",
             "xoffset", "width", "height", "x0", "y0", "z0", "theta_x", "theta_y", "theta_z"
@@ -269,28 +339,113 @@ class GeometryService:
                 continue
             else:
                 det_id = name_to_id[det_name]
-            plane = Plane(
-                detector_id=det_id,
-                detector_name=row.det_name,
-                x0=row.x0,
-                y0=row.y0,
-                z0=row.z0,
-                height=row.height,
-                n_elements=row.n_ele,
-                spacing=row.cell_spacing,
-                cell_width=row.cell_width,
-                angle_from_vert=row.angle_from_vert,
-                xoffset=row.xoffset,
-                theta_x=row.theta_x,
-                theta_y=row.theta_y,
-                theta_z=row.theta_z,
-                delta_w=0.0   # Assuming deltaW is not provided in the TSV, set to 0.0 
-            )
-            self.detectors[det_id] = plane
+            self.add_plane(det_id, row.det_name, row)
 
+        self.build_tables()
+        self.c2h = {}
         self.init_hodo_mask_lut()
+        self.compile_hodo_mask_lut()
+
+    def lut_cache_key(self):
+        """
+        Hash of everything the cached geometry depends on: the TSV contents,
+        TX_MAX / TY_MAX / BUFFER and the hodo-to-chamber map.
+        """
+        h = hashlib.sha256()
+        with open(self.tsv_path, "rb") as f:
+            h.update(f.read())
+        h.update(repr((LUT_CACHE_VERSION, TX_MAX, TY_MAX, BUFFER, sorted(CHAM_LUT_MAP.items()))).encode())
+        return h.hexdigest()[:20]
+
+    def _lut_cache_dirs(self):
+        """
+        cache_dir, then FALLBACK_LUT_CACHE_DIR if cache_dir is the default one.
+        """
+        if self.cache_dir is None:
+            return []
+        if self.cache_dir == DEFAULT_LUT_CACHE_DIR and "KTRACKER_GEOM_CACHE" not in os.environ:
+            return [self.cache_dir, FALLBACK_LUT_CACHE_DIR]
+        return [self.cache_dir]
+
+    def _lut_cache_name(self):
+        return f"geometry_{self.lut_cache_key()}.npz"
+
+    def load_lut_cache(self):
+        """
+        Restores the planes, the dense tables, c2h and its compiled bitset from
+        the cache, without reading the TSV with pandas. Returns False on a miss.
+        """
+        name = self._lut_cache_name() if self.cache_dir is not None else None
+        for cache_dir in self._lut_cache_dirs():
+            path = os.path.join(cache_dir, name)
+            if not os.path.exists(path):
+                continue
+            try:
+                with np.load(path) as cached:
+                    det_ids, names = cached["plane_det_id"], cached["plane_name"]
+                    params = cached["plane_params"]
+                    tables = {table: cached[table] for table in TABLE_NAMES}
+                    cham_uids, counts = cached["c2h_cham"], cached["c2h_count"]
+                    hodo_uids = cached["c2h_hodo"]
+                    hodo_paddle_uids = cached["hodo_paddle_uids"]
+                    hodo_uid_col = cached["hodo_uid_col"]
+                    c2h_bits = cached["c2h_bits"]
+            except (OSError, KeyError, ValueError) as err:
+                print(f"[WARNING] Ignoring unreadable geometry cache {path}: {err}")
+                continue
+
+            for det_id, det_name, row in zip(det_ids.tolist(), names.tolist(), params.tolist()):
+                row = dict(zip(PLANE_PARAMS, row), n_ele=int(row[0]))
+                self.add_plane(det_id, det_name, _Row(row))
+            for table, value in tables.items():
+                setattr(self, table, value)
+            self.hodo_paddle_uids, self.hodo_uid_col, self.c2h_bits = hodo_paddle_uids, hodo_uid_col, c2h_bits
+
+            hodo_uids, ends = hodo_uids.tolist(), np.cumsum(counts).tolist()
+            self.c2h = {c: hodo_uids[end - n:end] for c, n, end in zip(cham_uids.tolist(), counts.tolist(), ends)}
+            return True
+        return False
+
+    def save_lut_cache(self):
+        """
+        Writes the planes, the dense tables, c2h and its compiled bitset to the
+        cache (atomically, so parallel workers never see a partial file). A
+        default cache directory that cannot be written falls back to
+        FALLBACK_LUT_CACHE_DIR; other failures only print a warning.
+        """
+        planes = sorted(self.detectors.items())
+        arrays = dict(
+            plane_det_id=np.array([det_id for det_id, _ in planes], dtype=np.int64),
+            plane_name=np.array([plane.detector_name for _, plane in planes], dtype=str),
+            plane_params=np.array([[plane.n_elements, plane.spacing, plane.cell_width,
+                                    plane.angle_from_vert, plane.xoffset, plane.height, plane.x0,
+                                    plane.y0, plane.z0, plane.theta_x, plane.theta_y, plane.theta_z]
+                                   for _, plane in planes], dtype=float).reshape(-1, len(PLANE_PARAMS)),
+            c2h_cham=np.fromiter(self.c2h.keys(), dtype=np.int64, count=len(self.c2h)),
+            c2h_count=np.array([len(v) for v in self.c2h.values()], dtype=np.int64),
+            c2h_hodo=np.array([u for v in self.c2h.values() for u in v], dtype=np.int64),
+            hodo_paddle_uids=self.hodo_paddle_uids,
+            hodo_uid_col=self.hodo_uid_col,
+            c2h_bits=self.c2h_bits,
+            **{table: getattr(self, table) for table in TABLE_NAMES},
+        )
+
+        cache_dirs = self._lut_cache_dirs()
+        for k, cache_dir in enumerate(cache_dirs):
+            path = os.path.join(cache_dir, self._lut_cache_name())
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(suffix=".npz", dir=cache_dir)
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, **arrays)
+                os.replace(tmp, path)
+                return
+            except OSError as err:
+                if k + 1 == len(cache_dirs):
+                    print(f"[WARNING] Could not write geometry cache {path}: {err}")
     
     def dump_geometry_summary(self, output_path="geometry_dump.tsv"):
+        import pandas as pd
         rows = []
         for det_id, plane in self.detectors.items():
             row = {
@@ -328,72 +483,167 @@ class GeometryService:
     
     def get_wire_endpoints(self, det_id, elem_id):
         return self.detectors[det_id].get_wire_endpoints(elem_id)
+
+    def build_tables(self):
+        """
+        Dense NumPy tables indexed by detectorID (and elementID for wire_pos),
+        so whole chunks of hits can be looked up with one gather (see
+        GeometryTables). Row 0 and detectorIDs missing from the geometry stay
+        at their fill values.
+        """
+        size = max(self.detectors, default=0) + 1
+        max_elements = max((plane.n_elements for plane in self.detectors.values()), default=0)
+
+        self.det_known = np.zeros(size, dtype=bool)
+        self.z0 = np.full(size, np.nan)
+        self.plane_type = np.zeros(size, dtype=np.int64)
+        self.n_elements = np.zeros(size, dtype=np.int64)
+        self.wire_pos = np.full((size, max_elements + 1), np.nan)
+        self.wire_coef = np.full((size, 6), np.nan)
+
+        for det_id, plane in self.detectors.items():
+            self.det_known[det_id] = True
+            self.z0[det_id] = plane.z0
+            self.plane_type[det_id] = plane.planeType
+            self.n_elements[det_id] = plane.n_elements
+            self.wire_pos[det_id, 1:plane.n_elements + 1] = \
+                plane.get_wire_position(np.arange(1, plane.n_elements + 1))
+
+            c = self.wire_coef[det_id]
+            c[WIRE_MID] = (plane.n_elements + 1) / 2.0
+            c[WIRE_SPACING] = plane.spacing
+            c[WIRE_XOFFSET] = plane.xoffset
+            c[WIRE_X0COS] = plane.x0 * plane.costheta
+            c[WIRE_Y0SIN] = plane.y0 * plane.sintheta
+            c[WIRE_DELTA_W] = plane.delta_w
+
+    def exp_element_ids(self, det_ids, positions):
+        """
+        Batched get_exp_element_id: hits are grouped by detector and every
+        group is resolved with one searchsorted over that plane's wire_pos row.
+        Detectors outside the geometry give -1.
+        """
+        det_ids, positions = np.broadcast_arrays(np.asarray(det_ids, dtype=np.int64),
+                                                 np.asarray(positions, dtype=float))
+        out = np.full(det_ids.shape, -1, dtype=np.int64)
+
+        flat_det, flat_pos, flat_out = det_ids.ravel(), positions.ravel(), out.reshape(-1)
+        order = np.argsort(flat_det, kind="stable")
+        uniq, starts = np.unique(flat_det[order], return_index=True)
+        for det_id, sel in zip(uniq.tolist(), np.split(order, starts[1:])):
+            if det_id in self.detectors:
+                flat_out[sel] = self._plane_exp_element_ids(det_id, flat_pos[sel])
+        return out
     
     
     
+    def _hodo_chamber_windows(self, hodo_id, cham_id, buffer):
+        """
+        Chamber element window (lo, hi) seen by every paddle of a hodoscope.
+
+        Vectorized over paddles 1..n and, for slanted chambers, over all wires:
+        the paddle box is opened by TX_MAX / TY_MAX at the chamber z, X planes
+        take the expected elements of the box edges, other planes the first and
+        last wire crossing either vertical edge, then ±buffer is applied.
+
+        Returns:
+            (np.ndarray[int], np.ndarray[int]): lo and hi, one entry per paddle
+        """
+        n_paddles = self.get_plane_n_elements(hodo_id)
+        paddles = np.arange(1, n_paddles + 1)
+        z0 = self.get_plane_position(hodo_id)
+        x0_min, x0_max, y0_min, y0_max = np.broadcast_arrays(
+            *self.detectors[hodo_id].get_2d_box_size(paddles))
+
+        z = self.get_plane_position(cham_id)
+        x_min = x0_min - abs(TX_MAX * (z - z0))
+        x_max = x0_max + abs(TX_MAX * (z - z0))
+        y_min = y0_min - abs(TY_MAX * (z - z0))
+        y_max = y0_max + abs(TY_MAX * (z - z0))
+
+        n_elements = self.get_plane_n_elements(cham_id)
+
+        if self.get_plane_type(cham_id) == 1:
+            elementID_lo = self._plane_exp_element_ids(cham_id, x_min)
+            elementID_hi = self._plane_exp_element_ids(cham_id, x_max)
+        else:
+            eids = np.arange(1, n_elements + 1)
+            x1, x2, y1, y2 = self.detectors[cham_id].get_wire_endpoints(eids)
+
+            # [paddle, wire] crossing table of both box edges with every wire
+            xl, xr = x_min[:, None], x_max[:, None]
+            yl, yh = y_min[:, None], y_max[:, None]
+            cross_left = line_crossing(xl, yl, xl, yh, x1, y1, x2, y2)
+            cross_right = line_crossing(xr, yl, xr, yh, x1, y1, x2, y2)
+            cross = cross_left | cross_right
+
+            any_cross = cross.any(axis=1)
+            first = np.argmax(cross, axis=1) + 1
+            last = n_elements - np.argmax(cross[:, ::-1], axis=1)
+            elementID_lo = np.where(any_cross, first, n_elements)
+            elementID_hi = np.where(any_cross, last, 0)
+
+        # Apply ±buffer
+        elementID_lo = np.maximum(1, elementID_lo - buffer)
+        elementID_hi = np.minimum(n_elements, elementID_hi + buffer)
+        return elementID_lo, elementID_hi
+
     def init_hodo_mask_lut(self):
         """
         Constructs a lookup table mapping chamber hits (by UID) to hodoscope hits that can justify keeping them.
         Includes TX_MAX and TY_MAX projections and ±BUFFER element padding.
         """
-        for hodo_id, cham_ids in CHAM_LUT_MAP.items():
+        # (paddle, chamber rank, element) order of the original nested loops
+        pairs = []
+        for hodo_rank, (hodo_id, cham_ids) in enumerate(CHAM_LUT_MAP.items()):
             if hodo_id not in self.detectors:
                 print(f"[WARNING] Hodo {hodo_id} not in geometry — skipping.")
                 continue
 
-            z_hodo = self.get_plane_position(hodo_id)
-
-            for hodo_elem in range(1, self.get_plane_n_elements(hodo_id) + 1):
-                hodo_uid = hodo_id * 1000 + hodo_elem
-                x0_min, x0_max, y0_min, y0_max = self.get_2d_box_size(hodo_id, hodo_elem)
-
-                for cham_id in cham_ids:
-                    if cham_id not in self.detectors:
-                        print(f"[WARNING] Chamber {cham_id} not in geometry — skipping.")
-                        continue
+            for rank, cham_id in enumerate(cham_ids):
+                if cham_id not in self.detectors:
+                    print(f"[WARNING] Chamber {cham_id} not in geometry — skipping.")
+                    continue
 
-                    z_cham = self.get_plane_position(cham_id)
-                    dz = z_cham - z_hodo
+                lo, hi = self._hodo_chamber_windows(hodo_id, cham_id, BUFFER)
+                n = np.maximum(hi - lo + 1, 0)
+                paddle = np.repeat(np.arange(1, lo.size + 1), n)
+                eid = np.repeat(lo, n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+                pairs.append((np.full(eid.size, hodo_rank), paddle, np.full(eid.size, rank),
+                              cham_id * 1000 + eid, hodo_id * 1000 + paddle))
 
-                    # Expand hodo paddle projection to chamber Z using TX_MAX and TY_MAX margin
-                    x_min = x0_min - abs(TX_MAX * dz)
-                    x_max = x0_max + abs(TX_MAX * dz)
-                    y_min = y0_min - abs(TY_MAX * dz)
-                    y_max = y0_max + abs(TY_MAX * dz)
+        if not pairs:
+            return
+        hodo_rank, paddle, rank, cham_uid, hodo_uid = (np.concatenate(col) for col in zip(*pairs))
+        order = np.lexsort((cham_uid, rank, paddle, hodo_rank))
 
-                    elementID_lo = self.get_plane_n_elements(cham_id)
-                    elementID_hi = 0
-                    
-                    n_elements = self.get_plane_n_elements(cham_id)
+        for c, h in zip(cham_uid[order].tolist(), hodo_uid[order].tolist()):
+            self.c2h.setdefault(c, []).append(h)
 
-                    plane_type = self.get_plane_type(cham_id)
-
-                    if plane_type == 1:
-                        elementID_lo = self.get_exp_element_id(cham_id, x_min)
-                        elementID_hi = self.get_exp_element_id(cham_id, x_max)
-                                               
-                    else:
-                        for eid in range(1, n_elements + 1):
-                            x1, x2, y1, y2 = self.detectors[cham_id].get_wire_endpoints(eid)
+    def compile_hodo_mask_lut(self):
+        """
+        Compiles c2h into a dense bit-packed table for vectorized hodo masking.
 
-                            cross_left = line_crossing(x_min, y_min, x_min, y_max, x1, y1, x2, y2)
-                            cross_right = line_crossing(x_max, y_min, x_max, y_max, x1, y1, x2, y2)
+        Every hodo UID that appears in c2h gets a bit index k (hodo_uid_col), and
+        row c2h_bits[chamber_uid] holds, packed into uint64 words, the bits of all
+        hodo UIDs that can justify that chamber hit. Chamber UIDs without a c2h
+        entry have an all-zero row, so they never overlap anything.
+        """
+        hodo_uids = sorted({hodo_uid for hodo_list in self.c2h.values() for hodo_uid in hodo_list})
+        self.hodo_paddle_uids = np.array(hodo_uids, dtype=np.int64)
 
-                            if not cross_left and not cross_right:
-                                continue
-                            if eid < elementID_lo:
-                                elementID_lo = eid
-                            if eid > elementID_hi:
-                                elementID_hi = eid    
+        self.hodo_uid_col = np.full(max(hodo_uids, default=-1) + 1, -1, dtype=np.int64)
+        self.hodo_uid_col[self.hodo_paddle_uids] = np.arange(len(hodo_uids))
 
-                    # Apply ±BUFFER
-                    elementID_lo = max(1, elementID_lo - BUFFER)
-                    elementID_hi = min(n_elements, elementID_hi + BUFFER)
+        n_words = max(1, (len(hodo_uids) + 63) // 64)
+        self.c2h_bits = np.zeros((max(self.c2h, default=-1) + 1, n_words), dtype=np.uint64)
 
-                    # Map range to hodo UID
-                    for eid in range(elementID_lo, elementID_hi + 1):
-                        cham_uid = cham_id * 1000 + eid
-                        self.c2h.setdefault(cham_uid, []).append(hodo_uid)
+        pairs = [(cham_uid, hodo_uid) for cham_uid, hodo_list in self.c2h.items() for hodo_uid in hodo_list]
+        if pairs:
+            cham, hodo = np.array(pairs, dtype=np.int64).T
+            cols = self.hodo_uid_col[hodo]
+            np.bitwise_or.at(self.c2h_bits, (cham, cols // 64),
+                             np.left_shift(np.uint64(1), (cols % 64).astype(np.uint64)))
 
     def init_hodo_mask_lut_new(self):
         """
@@ -411,64 +661,67 @@ class GeometryService:
             if hodo_id not in self.detectors:
                 print(f"[SKIP] Hodo {hodo_id} not in geometry.")
                 continue
-            
-            n_paddles = self.get_plane_n_elements(hodo_id)
-            for paddle_id in range(1, n_paddles + 1):
-                hodo_uid = hodo_id * 1000 + paddle_id
-
-                z0 = self.get_plane_position(hodo_id)
-                x0_min, x0_max, y0_min, y0_max = self.get_2d_box_size(hodo_id, paddle_id)
-
-                for cham_id in cham_ids:
-                    if cham_id not in self.detectors:
-                        print(f"[WARN] Chamber {cham_id} not in geometry.")
-                        continue
-                    if cham_id < 1:
-                        continue
-                    
-                    z = self.get_plane_position(cham_id)
-                    x_min = x0_min - abs(TX_MAX * (z - z0))
-                    x_max = x0_max + abs(TX_MAX * (z - z0))
-                    y_min = y0_min - abs(TY_MAX * (z - z0))
-                    y_max = y0_max + abs(TY_MAX * (z - z0))
-
-                    elementID_lo = self.get_plane_n_elements(cham_id)
-                    elementID_hi = 0
-                    
-                    n_elements = self.get_plane_n_elements(cham_id)
-
-                    if self.get_plane_type(cham_id) == 1:
-                        elementID_lo = self.get_exp_element_id(cham_id, x_min)
-                        elementID_hi = self.get_exp_element_id(cham_id, x_max)
-
-                    else:
-                        for eid in range(1, n_elements + 1):
-                            x1, x2, y1, y2 = self.detectors[cham_id].get_wire_endpoints(eid)
-
-                            cross_left = line_crossing(x_min, y_min, x_min, y_max, x1, y1, x2, y2)
-                            cross_right = line_crossing(x_max, y_min, x_max, y_max, x1, y1, x2, y2)
-
-                            if not cross_left and not cross_right:
-                                continue
-                            if eid < elementID_lo:
-                                elementID_lo = eid
-                            if eid > elementID_hi:
-                                elementID_hi = eid    
-       
-                    # Apply ±BUFFER
-                    elementID_lo = max(1, elementID_lo - 2)
-                    elementID_hi = min(self.get_plane_n_elements(cham_id), elementID_hi + 2)
-
-                    self.h2celementID_lo[hodo_uid].append(cham_id * 1000 + elementID_lo)
-                    self.h2celementID_hi[hodo_uid].append(cham_id * 1000 + elementID_hi)
+
+            # Chamber UID windows of every paddle, one (lo, hi) pair per chamber
+            windows = []
+            for cham_id in cham_ids:
+                if cham_id not in self.detectors:
+                    print(f"[WARN] Chamber {cham_id} not in geometry.")
+                    continue
+                if cham_id < 1:
+                    continue
+                lo, hi = self._hodo_chamber_windows(hodo_id, cham_id, 2)
+                windows.append(((cham_id * 1000 + lo).tolist(), (cham_id * 1000 + hi).tolist()))
+
+            if not windows:
+                continue
+            for k in range(self.get_plane_n_elements(hodo_id)):
+                hodo_uid = hodo_id * 1000 + k + 1
+                self.h2celementID_lo[hodo_uid].extend(lo[k] for lo, _ in windows)
+                self.h2celementID_hi[hodo_uid].extend(hi[k] for _, hi in windows)
 
         self.c2helementIDs.clear()
-        for hodo_uid, lo_list in self.h2celementID_lo.items():
-            for i, cham_uid_lo in enumerate(lo_list):
-                cham_uid_hi = self.h2celementID_hi[hodo_uid][i]
-                for j in range(cham_uid_lo, cham_uid_hi + 1):
-                    self.c2helementIDs[j].append(hodo_uid)
-                    
+        hodo_uids = [(hodo_uid, len(lo_list)) for hodo_uid, lo_list in self.h2celementID_lo.items()]
+        if not hodo_uids:
+            return
+        lo = np.concatenate([self.h2celementID_lo[u] for u, _ in hodo_uids]).astype(np.int64)
+        hi = np.concatenate([self.h2celementID_hi[u] for u, _ in hodo_uids]).astype(np.int64)
+        hodo = np.repeat([u for u, _ in hodo_uids], [n for _, n in hodo_uids])
+
+        # Expand every [lo, hi] UID range in LUT order
+        n = np.maximum(hi - lo + 1, 0)
+        cham_uid = np.repeat(lo, n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        for c, h in zip(cham_uid.tolist(), np.repeat(hodo, n).tolist()):
+            self.c2helementIDs[c].append(h)
+
+    def _plane_exp_element_ids(self, detector_id, pos_exp):
+        """
+        get_exp_element_id for an array of positions on one plane
+        (np.searchsorted in place of bisect_left).
+        """
+        plane = self.detectors[detector_id]
+        pos_exp = np.asarray(pos_exp, dtype=float)
+        element_pos = self.wire_pos[detector_id, 1:plane.n_elements + 1]
+        if element_pos.size == 0:
+            return np.full(pos_exp.shape, -1, dtype=np.int64)
+
+        pos_min = element_pos[0] - 0.5 * plane.cell_width
+        pos_max = element_pos[-1] + 0.5 * plane.cell_width
+
+        index = np.searchsorted(element_pos, pos_exp, side="left")
+        nearest = element_pos[np.minimum(index, element_pos.size - 1)]
+        adjustment = np.where((nearest - pos_exp) > 0.5 * plane.spacing, -1, 0)
+        element_id = np.where(index < element_pos.size, index + 1 + adjustment, plane.n_elements)
+
+        if detector_id > N_CHAMBER_PLANES + N_HODO_PLANES + N_PROP_PLANES:
+            bottom = ((detector_id - 55) & 2) > 0
+            if bottom:
+                element_id = plane.n_elements + 1 - element_id
+
+        element_id = np.where(pos_exp < pos_min, 0, element_id)
+        element_id = np.where(pos_exp > pos_max, plane.n_elements + 1, element_id)
+        return element_id.astype(np.int64)
+
     def get_exp_element_id(self, detector_id, pos_exp):
         """
         Python translation of GeomSvc::getExpElementID in C++ (GeomSvc.cxx).
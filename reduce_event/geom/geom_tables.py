@@ -0,0 +1,83 @@
+# geom/geom_tables.py
+
+import os
+import numpy as np
+
+
+# Arrays that make up the array form of the geometry and the hodo-mask LUT
+TABLE_FIELDS = (
+    "det_known", "z0", "plane_type", "n_elements", "wire_pos", "wire_coef",
+    "c2h_bits", "hodo_uid_col", "hodo_paddle_uids",
+)
+
+# Columns of wire_coef, the per-plane terms of Plane.get_wire_position
+WIRE_MID, WIRE_SPACING, WIRE_XOFFSET, WIRE_X0COS, WIRE_Y0SIN, WIRE_DELTA_W = range(6)
+
+
+class GeometryTables:
+    """
+    Array-only lookups shared by GeometryService and SharedGeometry.
+
+    Subclasses provide the TABLE_FIELDS arrays, all indexed by detectorID:
+    det_known, z0, plane_type (0 if unknown), n_elements, wire_pos[det, elem]
+    (NaN padded) and wire_coef[det, :] for extrapolating wire positions, plus
+    the compiled hodo LUT (c2h_bits, hodo_uid_col, hodo_paddle_uids).
+    """
+
+    def known_detectors(self, det_ids):
+        """
+        True for every detectorID that is in the geometry.
+        """
+        det_ids = np.asarray(det_ids, dtype=np.int64)
+        in_range = (det_ids >= 0) & (det_ids < self.det_known.size)
+        return in_range & self.det_known[np.where(in_range, det_ids, 0)]
+
+    def wire_positions(self, det_ids, elem_ids):
+        """
+        Batched get_wire_position: one gather from the wire_pos table.
+
+        Elements outside 1..n_elements of a known detector are extrapolated
+        from wire_coef with the same arithmetic as get_wire_position; hits on
+        detectors outside the geometry get NaN.
+        """
+        det_ids = np.asarray(det_ids, dtype=np.int64)
+        elem_ids = np.asarray(elem_ids, dtype=np.int64)
+        known = self.known_detectors(det_ids)
+        det_idx = np.where(known, det_ids, 0)
+        in_table = known & (elem_ids >= 1) & (elem_ids <= self.n_elements[det_idx])
+
+        pos = np.where(in_table, self.wire_pos[det_idx, np.where(in_table, elem_ids, 0)], np.nan)
+        outside = np.flatnonzero(known & ~in_table)
+        if outside.size:
+            c = self.wire_coef[det_ids[outside]]
+            dw = (elem_ids[outside] - c[:, WIRE_MID]) * c[:, WIRE_SPACING] + c[:, WIRE_XOFFSET]
+            pos[outside] = dw + c[:, WIRE_X0COS] + c[:, WIRE_Y0SIN] + c[:, WIRE_DELTA_W]
+        return pos
+
+
+def publish_tables(geom, directory):
+    """
+    Writes the TABLE_FIELDS arrays of geom as .npy files in directory, for
+    SharedGeometry to map read-only.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name in TABLE_FIELDS:
+        np.save(os.path.join(directory, name + ".npy"), np.ascontiguousarray(getattr(geom, name)))
+    return directory
+
+
+class SharedGeometry(GeometryTables):
+    """
+    Read-only geometry attached to tables published by publish_tables.
+
+    Every array is an np.memmap of the published file, so attaching costs a
+    few opens and all processes share the same page-cache pages instead of
+    each parsing the TSV and rebuilding Plane objects and the hodo LUT. It
+    serves the chunk filters (HitBatch, hodo_mask_chunk, sagitta_reducer_chunk,
+    decluster_hits_chunk); the per-event list filters still need GeometryService.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        for name in TABLE_FIELDS:
+            setattr(self, name, np.load(os.path.join(directory, name + ".npy"), mmap_mode="r"))
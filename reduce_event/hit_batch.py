@@ -0,0 +1,143 @@
+"""
+Structure-of-arrays container for the hits of one chunk.
+
+A HitBatch holds the hit columns sorted by (event, detectorID, elementID)
+together with the permutation back to the input order. Columns derived from
+the hits (packed UID, plane z/type, wire position) are computed on first use
+and shared by every filter, so no filter re-derives or copies them.
+"""
+
+from functools import cached_property
+import numpy as np
+
+
+def event_index(offsets):
+    """
+    Returns the event number (0..N-1) of every flat hit in the chunk.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    return np.repeat(np.arange(offsets.size - 1), np.diff(offsets))
+
+
+def sort_key(evt, det, elem):
+    """
+    Composite int64 key ordering hits by (event, detectorID, elementID).
+
+    detectorID and elementID are offset to start at 0 and packed below the
+    event index using their observed spans, so any ID range fits.
+    """
+    evt = np.asarray(evt, dtype=np.int64)
+    det = np.asarray(det, dtype=np.int64)
+    elem = np.asarray(elem, dtype=np.int64)
+    if evt.size == 0:
+        return evt
+
+    det_min, elem_min = det.min(), elem.min()
+    det_span = det.max() - det_min + 1
+    elem_span = elem.max() - elem_min + 1
+    return (evt * det_span + (det - det_min)) * elem_span + (elem - elem_min)
+
+
+def sort_chunk(evt, det, elem):
+    """
+    Permutation ordering the chunk by (event, detectorID, elementID), or None
+    if the hits are already in that order (e.g. files written by this reducer).
+
+    One stable argsort on the composite key, so ties keep their original order
+    exactly as the per-event lexsort((elem, det)) did.
+    """
+    key = sort_key(evt, det, elem)
+    if np.all(key[1:] >= key[:-1]):
+        return None
+    return np.argsort(key, kind="stable")
+
+
+def hit_uid(det, elem):
+    """
+    Packed int32 hit UID, detectorID * 1000 + elementID.
+    """
+    return np.asarray(det, dtype=np.int32) * 1000 + np.asarray(elem, dtype=np.int32)
+
+
+class HitBatch:
+    """
+    Sorted hit columns of a chunk plus lazily derived per-hit columns.
+
+    Attributes:
+        evt, det, elem, drift, tdc (np.ndarray): hit columns in sorted order
+        perm (np.ndarray[int] or None): sorted index -> original index,
+            None if the input was already sorted
+        n_events (int): number of events in the chunk
+        geom (GeometryService or None): geometry for the derived columns
+    """
+
+    def __init__(self, evt, det, elem, drift, tdc, perm, n_events, geom=None):
+        self.evt = evt
+        self.det = det
+        self.elem = elem
+        self.drift = drift
+        self.tdc = tdc
+        self.perm = perm
+        self.n_events = n_events
+        self.geom = geom
+
+    @classmethod
+    def from_chunk(cls, detectorIDs, elementIDs, driftDistances, tdcTimes, offsets, geom=None):
+        """
+        Builds the batch from flat hit columns and per-event offsets (length N+1).
+        """
+        det   = np.asarray(detectorIDs)
+        elem  = np.asarray(elementIDs)
+        drift = np.asarray(driftDistances, dtype=float)
+        tdc   = np.asarray(tdcTimes, dtype=float)
+        offsets = np.asarray(offsets, dtype=np.int64)
+
+        evt = event_index(offsets)
+        perm = sort_chunk(evt, det, elem)
+        if perm is None:
+            return cls(evt, det, elem, drift, tdc, None, offsets.size - 1, geom)
+        return cls(evt[perm], det[perm], elem[perm], drift[perm], tdc[perm],
+                   perm, offsets.size - 1, geom)
+
+    def __len__(self):
+        return self.evt.size
+
+    def to_original(self, keep):
+        """
+        Maps a keep mask from sorted order back to the input hit order.
+        """
+        if self.perm is None:
+            return keep
+        keep_orig = np.empty_like(keep)
+        keep_orig[self.perm] = keep
+        return keep_orig
+
+    @cached_property
+    def uid(self):
+        """Packed detectorID * 1000 + elementID (int32)."""
+        return hit_uid(self.det, self.elem)
+
+    @cached_property
+    def in_geom(self):
+        """True for hits whose detector is in the geometry."""
+        return self.geom.known_detectors(self.det)
+
+    @cached_property
+    def _det_index(self):
+        # detectorID usable as a table index (0 for hits outside the geometry)
+        return np.where(self.in_geom, self.det, 0)
+
+    @cached_property
+    def z(self):
+        """Plane z of every hit; NaN outside the geometry."""
+        return self.geom.z0[self._det_index]
+
+    @cached_property
+    def ptype(self):
+        """Plane type of every hit; 0 outside the geometry."""
+        return self.geom.plane_type[self._det_index]
+
+    @cached_property
+    def wire_pos(self):
+        """Wire position of every hit; NaN outside the geometry."""
+        return self.geom.wire_positions(self.det, self.elem)
@@ -2,106 +2,472 @@
 Run full hit reduction pipeline.
 """
 
-import ROOT
 import numpy as np
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import threading
 import time
-from filters.out_of_time_removal import remove_out_of_time_hits
-from filters.decluster_hits import decluster_hits
-from filters.deduplicate_hits import deduplicate_hits
-from reduce_event.filters.hodo_mask import hodo_mask
-from reduce_event.filters.sagitta import sagitta_reducer
-from utils.io_helpers import write_reduced
+from functools import partial
+from engine import reduce_chunk
+from utils.io_helpers import HIT_BRANCHES, NP_DTYPES, DEFAULT_BACKEND, get_backend, resolve_backend
+from utils.chunk_sizer import ChunkSizer, PROBE_EVENTS, parse_size, peak_rss_bytes, rss_bytes
+from utils.keep_mask import KeepMaskStore, DEFAULT_KEEP_MASK_BUDGET
+from utils.profiling import ReductionProfile, report_path
 from geom.geom_service import GeometryService
+from geom.geom_tables import SharedGeometry, publish_tables
+from filters.out_of_time_removal import load_tdc_windows
+from filters.occupancy import FLAG_BRANCH, DEFAULT_MAX_HITS, rejected_events
 
 
-BRANCHES_TO_FILTER = ["detectorID", "elementID", "driftDistance", "tdcTime"] #"hitID", "hit_trackID", "processID"
+# Hit-level branches filtered with the keep mask. None = every std::vector branch
+# with one element per hit (detectorID, ..., hitID, hit_trackID, processID, ...).
+BRANCHES_TO_FILTER = None
+
+DEFAULT_STEP_SIZE = 10000  # events per chunk handed to the reduction engine
+DEFAULT_PREFETCH = 2       # chunks queued between the read, reduce and write threads
 
 def reduce_event(detectorIDs, driftDistances, tdcTimes, elementIDs, **kwargs):
-    geom = kwargs.get("geom", None)
+    """
+    Per-event wrapper over the chunk engine.
+    Returns the kept hit indices in their original order.
+    """
+    det = np.asarray(detectorIDs)
+    offsets = np.array([0, det.size], dtype=np.int64)
+    keep = reduce_chunk(det, elementIDs, driftDistances, tdcTimes, offsets, **kwargs)
+    return np.flatnonzero(keep).tolist()
 
-    det   = np.asarray(detectorIDs)
-    elem  = np.asarray(elementIDs)
-    drift = np.asarray(driftDistances, dtype=float)
-    tdc   = np.asarray(tdcTimes, dtype=float)
 
-    # Sort by detectorID (primary) then elementID (secondary)
-    perm = np.lexsort((elem, det))          # sorted_index -> original_index
+def load_geometry(tsv_path, dump_summary=True, **kwargs):
+    """
+    Loads the geometry and hodoscope IDs needed by the enabled filters.
+    Returns (None, set()) when no geometry-based filter is on.
+    """
+    if not (kwargs.get('hodomask', False) or kwargs.get('sagitta', False) or kwargs.get('decluster', False)):
+        return None, set()
+
+    geom = GeometryService(tsv_path=tsv_path)   # loads the TSV and the (cached) hodo LUT
+    if dump_summary:
+        geom.dump_geometry_summary()
+    return geom, {31, 32, 37, 38, 39, 40}
 
-    det_s, elem_s = det[perm], elem[perm]
-    drift_s, tdc_s = drift[perm], tdc[perm]
 
-    keep_idx = list(range(perm.size))  # indices in SORTED space [0..N)
+def event_branches(**kwargs):
+    """
+    Per-event branches the writers add for the enabled filters: the
+    occupancy flag (FLAG_BRANCH) when the occupancy cut is on, else none.
+    """
+    if not kwargs.get('occupancy', False):
+        return None
+    return {FLAG_BRANCH: partial(rejected_events, max_hits=kwargs.get('max_hits', DEFAULT_MAX_HITS))}
 
-    if kwargs.get('dedup', False):
-        keep_idx = deduplicate_hits(det_s.tolist(), elem_s.tolist(), keep_idx)
-    if kwargs.get('outoftime', False):
-        keep_idx = remove_out_of_time_hits(tdc_s.tolist(), keep_idx)
-    if kwargs.get('decluster', False):
-        keep_idx = decluster_hits(det_s.tolist(), elem_s.tolist(),
-                                  drift_s.tolist(), tdc_s.tolist(),
-                                  geom, keep_idx)
-    if kwargs.get('hodomask', False):
-        hodo_ids = kwargs.get('hodo_ids', set())
-        keep_idx = hodo_mask(det_s.tolist(), elem_s.tolist(), geom, hodo_ids, keep_idx)
-    if kwargs.get('sagitta', False):
-        keep_idx = sagitta_reducer(det_s.tolist(), elem_s.tolist(), geom, keep_idx)
 
-    # Map from sorted indices -> original indices
-    keep_idx_orig = perm[np.asarray(keep_idx, dtype=int)].tolist()
-    return keep_idx_orig
+def _reduce_one(chunk, stats, **kwargs):
+    """
+    Reduces one (entry_start, hits, offsets) chunk, adding to stats and the
+    profile; returns the keep mask.
+    """
+    entry_start, hits, offsets = chunk
+    t0 = time.perf_counter()
+    keep = reduce_chunk(
+        hits["detectorID"], hits["elementID"],
+        hits["driftDistance"], hits["tdcTime"], offsets,
+        entry_start=entry_start, **kwargs
+    )
+    dt = time.perf_counter() - t0
+    stats["reduce"] += dt
+    stats["kept"] += int(keep.sum())
+    profile = kwargs.get("profile", None)
+    if profile is not None:
+        profile.record_chunk(entry_start, offsets, keep, dt)
+        # Per-event latency: reduce a few events of the chunk again, one at a time
+        single = dict(kwargs, profile=None)
+        for k in profile.sample_events(offsets):
+            lo, hi = offsets[k], offsets[k + 1]
+            t0 = time.perf_counter()
+            reduce_chunk(
+                hits["detectorID"][lo:hi], hits["elementID"][lo:hi],
+                hits["driftDistance"][lo:hi], hits["tdcTime"][lo:hi], np.array([0, hi - lo]),
+                **single
+            )
+            profile.record_event(entry_start + k, hi - lo, time.perf_counter() - t0)
+    return keep
+
+
+def reduce_chunks(chunks, on_chunk, prefetch=0, **kwargs):
+    """
+    Runs reduce_chunk over every chunk and hands (entry_start, hits, offsets, keep)
+    to on_chunk. Returns per-stage timings and the number of kept hits.
+    Chunks are also recorded in kwargs['profile'] if one is given.
+
+    prefetch > 0 runs reading and writing in their own threads (see
+    _reduce_chunks_pipelined) with at most prefetch chunks queued per stage.
+    """
+    if prefetch > 0:
+        return _reduce_chunks_pipelined(chunks, on_chunk, prefetch, **kwargs)
+
+    stats = {"read": 0.0, "reduce": 0.0, "write": 0.0, "kept": 0}
+
+    while True:
+        t0 = time.perf_counter()
+        chunk = next(chunks, None)
+        stats["read"] += time.perf_counter() - t0
+        if chunk is None:
+            break
+
+        keep = _reduce_one(chunk, stats, **kwargs)
+
+        t1 = time.perf_counter()
+        on_chunk(*chunk, keep)
+        stats["write"] += time.perf_counter() - t1
+
+    return stats
+
+
+def _reduce_chunks_pipelined(chunks, on_chunk, depth, **kwargs):
+    """
+    reduce_chunks as a three-stage pipeline: a reader thread pulls chunk N+1
+    from chunks (basket decompression), this thread reduces chunk N, and a
+    writer thread hands chunk N-1 to on_chunk (output compression). zlib and
+    most NumPy work release the GIL, so the stages overlap.
+
+    The queues between stages are bounded to depth chunks each, so at most
+    about 2 * depth + 3 chunks are alive at once. Stage times are the busy
+    time of each thread and can add up to more than the wall time. An error
+    in any stage stops the others and is re-raised here.
+    """
+    stats = {"read": 0.0, "reduce": 0.0, "write": 0.0, "kept": 0}
+    read_queue, write_queue = queue.Queue(depth), queue.Queue(depth)
+    stop = threading.Event()
+    errors = []
+
+    # Blocking put/get that give up once another stage has failed
+    def put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def reader():
+        try:
+            while True:
+                t0 = time.perf_counter()
+                chunk = next(chunks, None)
+                stats["read"] += time.perf_counter() - t0
+                if not put(read_queue, chunk) or chunk is None:
+                    return
+        except BaseException as exc:
+            errors.append(exc)
+            stop.set()
+
+    def writer():
+        try:
+            while True:
+                item = get(write_queue)
+                if item is None:
+                    return
+                t0 = time.perf_counter()
+                on_chunk(*item)
+                stats["write"] += time.perf_counter() - t0
+        except BaseException as exc:
+            errors.append(exc)
+            stop.set()
+
+    threads = [threading.Thread(target=reader, name="reduce-reader", daemon=True),
+               threading.Thread(target=writer, name="reduce-writer", daemon=True)]
+    for t in threads:
+        t.start()
+    try:
+        while True:
+            chunk = get(read_queue)
+            if chunk is None:
+                break
+            keep = _reduce_one(chunk, stats, **kwargs)
+            if not put(write_queue, (*chunk, keep)):
+                break
+        put(write_queue, None)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for t in threads:
+            t.join()
+
+    if errors:
+        raise errors[0]
+    return stats
+
+
+def _chunk_step(step_size, max_memory, hit_branches, prefetch):
+    """
+    step_size as is, or a ChunkSizer for max_memory bytes if a budget is set.
+    The first chunk is at most step_size events; later ones follow the budget.
+    """
+    if max_memory is None:
+        return step_size
+    chunks_alive = 2 * prefetch + 3 if prefetch > 0 else 1
+    hit_bytes = sum(np.dtype(NP_DTYPES[ctype]).itemsize for ctype in hit_branches.values())
+    return ChunkSizer(max_memory, hit_bytes, chunks_alive, baseline=rss_bytes(),
+                      initial=min(step_size, PROBE_EVENTS))
+
+
+# Per-process state for workers=N runs, set once by _init_worker
+_WORKER_GEOM = None
+_WORKER_HODO_IDS = set()
+
+
+def _init_worker(geom_dir, hodo_ids):
+    # Attach to the tables published by the parent instead of rebuilding the geometry
+    global _WORKER_GEOM, _WORKER_HODO_IDS
+    _WORKER_GEOM = SharedGeometry(geom_dir) if geom_dir is not None else None
+    _WORKER_HODO_IDS = hodo_ids
+
+
+def _reduce_shard(task):
+    """
+    Reduces entries [entry_start, entry_stop) of the input into one partial file.
+    """
+    (input_file, part_file, entry_start, entry_stop, step_size, max_memory, hit_branches,
+     write_mode, backend, kwargs) = task
+
+    io = get_backend(backend)
+    if kwargs.get("prefetch", 0) > 0:
+        io.enable_threads()
+    source = io.EventSource(input_file)
+    writer = source.writer(part_file, hit_branches, write_mode, event_branches(**kwargs), partial=True)
+
+    step = _chunk_step(step_size, max_memory, hit_branches, kwargs.get("prefetch", 0))
+    chunks = source.iter_hit_chunks(step, hit_branches, entry_start, entry_stop)
+    stats = reduce_chunks(chunks, writer.write_chunk,
+                          geom=_WORKER_GEOM, hodo_ids=_WORKER_HODO_IDS, **kwargs)
+
+    t0 = time.perf_counter()
+    writer.close()
+    source.close()
+    stats["write"] += time.perf_counter() - t0
+    stats["profile"] = kwargs.get("profile", None)
+    stats["peak_rss"] = peak_rss_bytes()
+    return stats
+
+
+def _run_parallel(input_file, output_file, tsv_path, n_entries, step_size, max_memory, workers,
+                  hit_branches, write_mode, backend, **kwargs):
+    """
+    Splits [0, n_entries) into one contiguous shard per worker, reduces the shards
+    in a process pool and merges the partial files back in entry order.
+    Each shard fills its own ReductionProfile, folded into kwargs['profile'],
+    and sizes its chunks for an equal share of max_memory.
+
+    The geometry is built once here and published as memory-mapped tables
+    (see SharedGeometry), which every worker attaches to read-only.
+    """
+    profile = kwargs.pop("profile", None)
+    geom, hodo_ids = load_geometry(tsv_path, dump_summary=False, **kwargs)
+    geom_dir = publish_tables(geom, tempfile.mkdtemp(prefix="geom_tables_")) if geom is not None else None
+
+    bounds = np.linspace(0, n_entries, workers + 1).astype(np.int64)
+    part_dir = tempfile.mkdtemp(prefix="reduce_parts_", dir=os.path.dirname(os.path.abspath(output_file)))
+    part_files = [os.path.join(part_dir, f"part_{k:04d}.root") for k in range(workers)]
+    tasks = [
+        (input_file, part_files[k], int(bounds[k]), int(bounds[k + 1]),
+         step_size, max_memory // workers if max_memory is not None else None,
+         hit_branches, write_mode, backend,
+         dict(kwargs, profile=ReductionProfile(profile.top_k, profile.n_sample) if profile is not None else None))
+        for k in range(workers)
+    ]
+
+    try:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(geom_dir, hodo_ids)) as pool:
+            shard_stats = pool.map(_reduce_shard, tasks, chunksize=1)
+
+        merge_start = time.perf_counter()
+        get_backend(backend).merge_reduced(part_files, output_file)
+        merge_time = time.perf_counter() - merge_start
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+        if geom_dir is not None:
+            shutil.rmtree(geom_dir, ignore_errors=True)
 
+    stats = {key: sum(s[key] for s in shard_stats) for key in ("read", "reduce", "write", "kept")}
+    stats["merge"] = merge_time
+    stats["worker_peak_rss"] = [s["peak_rss"] for s in shard_stats]
+    if profile is not None:
+        for s in shard_stats:
+            profile.merge(s["profile"])
+    return stats
 
-def run_reduction(input_file, output_file, tsv_path, **kwargs):
+
+def run_reduction(input_file, output_file, tsv_path, step_size=DEFAULT_STEP_SIZE,
+                  streaming=True, keep_mask_budget=DEFAULT_KEEP_MASK_BUDGET,
+                  spill_dir=None, write_mode="bulk", hit_branches=BRANCHES_TO_FILTER,
+                  workers=1, tdc_calib=None, report=True, backend=DEFAULT_BACKEND,
+                  prefetch=DEFAULT_PREFETCH, max_memory=None, latency_samples=0, **kwargs):
     """
-    Read ROOT file, apply reduce_event, and write new ROOT file.
+    Read ROOT file in chunks of step_size events, apply the reduction engine,
+    and write new ROOT file.
+
+    With streaming=True every chunk is written as soon as it is reduced, so the
+    input file is opened and decompressed only once. streaming=False keeps the
+    older two-pass flow (reduce everything, then reopen the input to write);
+    its keep decisions are held in a KeepMaskStore, which spills to spill_dir
+    once it exceeds keep_mask_budget bytes.
+
+    write_mode="push_back" switches the ROOT writer back to the per-hit loop, which
+    is only useful to compare write throughput against the default "bulk".
+
+    hit_branches lists the branches to filter; None detects every vector branch
+    that shares the hit multiplicity, so truth branches stay aligned.
+
+    workers=N > 1 reduces N contiguous entry ranges in parallel processes (each
+    streaming into its own partial file, geometry loaded once per worker) and
+    merges them back in original entry order. The merged tree has the same
+    entries as a serial run.
+
+    backend selects the I/O layer (see io_helpers.get_backend): "uproot" reads
+    and writes without PyROOT, "root" keeps std::vector branches in the output
+    and needs ROOT installed. The default "auto" picks "root" when PyROOT is
+    importable, since Fun4Sim.C expects std::vector branches, and falls back to
+    "uproot" (counted-array branches) otherwise. With "uproot", workers=N
+    ends with a serial merge that compresses the whole output once (see
+    uproot_io.merge_reduced).
+
+    prefetch=N > 0 reads chunk N+1 and writes chunk N-1 in background threads
+    while chunk N is reduced, with at most N chunks queued between stages;
+    prefetch=0 runs the three stages one after another.
+
+    max_memory (bytes, or a string such as "2GB") replaces the fixed step_size
+    with chunks resized on the fly: bytes per event are estimated from the
+    running hits per event (see ChunkSizer) so that all chunks in flight fit
+    in the budget. With workers=N each worker gets max_memory / N. The budget
+    is approximate: chunk sizes are planned for 90% of it from estimated
+    costs per hit, and peak RSS is measured and reported, not enforced.
+    Dense files with large non-hit branches can still exceed it.
+
+    occupancy="drop" (or True) runs the event-level occupancy cut of
+    accept_event before any hit-level filter and empties the events that fail
+    it (max_hits sets the per-region thresholds, default
+    occupancy.DEFAULT_MAX_HITS). Entries stay in the output, so it keeps the
+    input's entry numbering. occupancy="flag" leaves the rejected events
+    unreduced instead. Either way the output tree gets a per-event bool
+    branch occupancyRejected marking them, and the report counts them.
+
+    report=True records per-filter time, hits in/out and events touched plus
+    chunk-mean latency and writes them as JSON next to the output file
+    (<output>_report.json). latency_samples=N > 0 adds per-event latency:
+    N events of every chunk (plus its busiest) are reduced again one at a
+    time, see ReductionProfile. That repeats work, up to about 10% of the reduction
+    time at N=8, so it is off by default.
     """
     total_start = time.perf_counter()
-    f = ROOT.TFile.Open(input_file, "READ")
-    tree = f.Get("tree")
-    if not tree:
-        raise RuntimeError(f"Could not find 'tree' in {input_file}")
-
-    index_data = []
-    
-    geom = None
-    HODO_IDS = set()
-    if kwargs.get('hodomask', False) or kwargs.get('sagitta', False) or kwargs.get('decluster', False):
-        geom = GeometryService(tsv_path=tsv_path)
-        geom.load_geometry_from_tsv()
-        geom.dump_geometry_summary()
-        HODO_IDS = {31, 32, 37, 38, 39, 40}
-
-    read_filter_start = time.perf_counter()
-    
-    for i, event in enumerate(tree):
-        detectorIDs = list(event.detectorID)
-        driftDistances = list(event.driftDistance)
-        tdcTimes = list(event.tdcTime)
-        elementIDs = list(event.elementID)
-
-        keep_idx = reduce_event(
-            detectorIDs, driftDistances, tdcTimes, elementIDs,
-            geom=geom, hodo_ids=HODO_IDS, **kwargs
-        )
-        
-        index_data.append({
-            "entry": i,
-            "keep_idx": keep_idx
-        })
-
-    f.Close()
-    read_filter_end = time.perf_counter()
-
-    write_start = time.perf_counter()
-    write_reduced(input_file, output_file, index_data)
-    write_end = time.perf_counter()
+    profile = ReductionProfile(sample_events=latency_samples) if report else None
+    kwargs['profile'] = profile
+    kwargs['prefetch'] = prefetch
+    if max_memory is not None:
+        max_memory = parse_size(max_memory)
+    if kwargs.get('occupancy', False) not in (None, False, True, "drop", "flag"):
+        raise ValueError(f"occupancy must be 'drop' or 'flag', got {kwargs['occupancy']!r}")
+    if kwargs.get('outoftime', False):
+        if tdc_calib is None:
+            raise ValueError("outoftime=True requires tdc_calib=<path to TDC window TSV>")
+        kwargs['tdc_windows'] = load_tdc_windows(tdc_calib)
+
+    if backend == "auto" and resolve_backend(backend) == "uproot":
+        print("[WARN] PyROOT is not importable; writing with the uproot backend "
+              "(counted arrays instead of std::vector branches)")
+    backend = resolve_backend(backend)
+    io = get_backend(backend)
+    if prefetch > 0:
+        io.enable_threads()
+    source = io.EventSource(input_file)
+
+    hit_branches = source.detect_hit_branches(hit_branches)
+    print(f"[INFO] Filtering hit branches: {', '.join(hit_branches)} ({backend} backend)")
+
+    if workers > 1:
+        n_entries = source.n_entries
+        source.close()
+        workers = min(workers, max(n_entries, 1))
+        stats = _run_parallel(input_file, output_file, tsv_path, n_entries, step_size, max_memory,
+                              workers, hit_branches, write_mode, backend, **kwargs)
+        mode = f"parallel ({workers} workers, stage times summed over workers)"
+    else:
+        geom, hodo_ids = load_geometry(tsv_path, **kwargs)
+
+        if streaming:
+            writer = source.writer(output_file, hit_branches, write_mode, event_branches(**kwargs))
+            on_chunk = writer.write_chunk
+            chunks = source.iter_hit_chunks(_chunk_step(step_size, max_memory, hit_branches, prefetch),
+                                            hit_branches)
+        else:
+            keep_store = KeepMaskStore(keep_mask_budget, spill_dir)
+            on_chunk = lambda entry_start, hits, offsets, keep: keep_store.append(keep, offsets)
+            # Two-pass mode only needs the engine columns now; the writer reads the rest
+            chunks = source.iter_hit_chunks(_chunk_step(step_size, max_memory, HIT_BRANCHES, prefetch),
+                                            HIT_BRANCHES)
+
+        stats = reduce_chunks(chunks, on_chunk, geom=geom, hodo_ids=hodo_ids, **kwargs)
+
+        write_start = time.perf_counter()
+        if streaming:
+            writer.close()
+            source.close()
+        else:
+            source.close()
+            io.write_reduced(input_file, output_file, keep_store, write_mode, hit_branches,
+                             event_branches=event_branches(**kwargs))
+            if keep_store.spilled:
+                print(f"[INFO] Keep mask spilled to disk ({keep_store.nbytes / 1024**2:.1f} MB)")
+            keep_store.close()
+        stats["write"] += time.perf_counter() - write_start
+        mode = "streaming (single pass)" if streaming else "two-pass"
+    if prefetch > 0:
+        mode += f", pipelined (prefetch {prefetch}, stage times overlap)"
 
     total_end = time.perf_counter()
+    memory = {"max_memory": max_memory, "peak_rss": peak_rss_bytes()}
+    if "worker_peak_rss" in stats:
+        memory["worker_peak_rss"] = stats["worker_peak_rss"]
 
     print("\n--- Timing Summary ---")
-    print(f"Reduction time: {read_filter_end - read_filter_start:.2f} s")
-    print(f"Write time:     {write_end - write_start:.2f} s")
+    print(f"Mode:           {mode}")
+    print(f"Read time:      {stats['read']:.2f} s")
+    print(f"Reduction time: {stats['reduce']:.2f} s")
+    print(f"Write time:     {stats['write']:.2f} s "
+          f"({write_mode}, {stats['kept'] / max(stats['write'], 1e-9) / 1e6:.2f} M kept hits/s)")
+    if "merge" in stats:
+        print(f"Merge time:     {stats['merge']:.2f} s")
     print(f"Total runtime:  {total_end - total_start:.2f} s")
+    print(f"Peak RSS:       {memory['peak_rss'] / 1024**2:.0f} MB"
+          + (f" (workers: {max(memory['worker_peak_rss']) / 1024**2:.0f} MB max)"
+             if "worker_peak_rss" in memory else "")
+          + (f", budget {max_memory / 1024**2:.0f} MB" if max_memory is not None else ""))
+
+    if profile is not None:
+        print()
+        profile.print_summary()
+        timing = {key: stats[key] for key in ("read", "reduce", "write", "merge") if key in stats}
+        timing["total"] = total_end - total_start
+        filters = [name for name in ("occupancy", "dedup", "outoftime", "decluster", "hodomask", "sagitta")
+                   if kwargs.get(name, False)]
+        path = report_path(output_file)
+        profile.write_json(path, input_file=input_file, output_file=output_file, mode=mode,
+                           step_size=step_size, write_mode=write_mode, backend=backend,
+                           prefetch=prefetch, enabled_filters=filters, timing=timing,
+                           memory_bytes=memory)
+        print(f"[INFO] Wrote reduction report to '{path}'")
 
 if __name__ == "__main__":
     # input_file = "/project/ptgroup/Catherine/kTracker/data/noisy/MC_negMuon_Dump_Feb21_10000_noisy.root" 
@@ -114,6 +480,7 @@ if __name__ == "__main__":
         input_file=input_file,
         output_file=output_file,
         tsv_path = "/project/ptgroup/Catherine/kTracker/reduce_event/geom/data/param.tsv",
+        occupancy=False,
         outoftime=False,
         dedup=False,
         decluster=True,
@@ -0,0 +1,109 @@
+import re
+import resource
+import sys
+
+
+ENGINE_BYTES_PER_HIT = 128   # peak reduce_chunk working memory per hit (tracemalloc, all filters on)
+COPIES_PER_CHUNK = 2         # hit columns of a chunk exist about twice while it is read or written
+EVENT_OVERHEAD_BYTES = 64    # offsets, counts and other per-event arrays
+PROBE_EVENTS = 1000          # first chunk, read before any hit multiplicity is known
+MIN_CHUNK_EVENTS = 100
+MAX_CHUNK_EVENTS = 1000000
+BUDGET_FRACTION = 0.9        # share of max_memory planned for; the rest is headroom for estimate errors
+
+_SIZE = re.compile(r"([\d.]+)\s*([KMGT]?)(?:I?B)?", re.IGNORECASE)
+_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def parse_size(value):
+    """
+    Bytes from a number or a string such as "2GB", "512 MB" or "1.5G" (powers of 1024).
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _SIZE.fullmatch(value.strip())
+    if not match:
+        raise ValueError(f"Cannot parse memory size '{value}', expected e.g. '2GB' or '512MB'")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def peak_rss_bytes():
+    """
+    Peak resident set size of this process so far.
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024   # Linux reports kB
+
+
+def rss_bytes():
+    """
+    Current resident set size of this process (Linux); the peak elsewhere.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return peak_rss_bytes()
+
+
+class ChunkSizer:
+    """
+    Picks the number of events of each chunk so the chunks alive at once fit
+    in a memory budget.
+
+    The budget is BUDGET_FRACTION of max_memory minus the baseline already in
+    use (interpreter, geometry, ...); the costs below are estimates, so the
+    held-back 10% absorbs allocator slack and events denser than the
+    average. Memory outside this model (reader buffers, the non-hit branches
+    the writer copies) is not counted, so the limit is approximate, not
+    enforced; peak RSS is reported to check it. A hit costs its hit_bytes of columns in each of the
+    chunks_alive chunks held at once (2 * prefetch + 3 in the threaded
+    pipeline, 1 without it), times COPIES_PER_CHUNK, plus the engine's
+    working memory for the chunk being reduced. Hits per event is the larger
+    of the running average and the last chunk's, so a dense stretch of the
+    file shrinks the next chunk straight away.
+
+    Passed as step_size to iter_hit_chunks, which asks next_size() before
+    each chunk and reports what it read with record().
+    """
+
+    def __init__(self, max_memory, hit_bytes, chunks_alive=1, baseline=0, initial=PROBE_EVENTS):
+        self.max_memory = max_memory
+        self.budget = int(BUDGET_FRACTION * max_memory) - baseline
+        if self.budget <= 0:
+            print(f"[WARNING] {baseline / 1024**2:.0f} MB already in use, over the memory budget of "
+                  f"{max_memory / 1024**2:.0f} MB; using chunks of {MIN_CHUNK_EVENTS} events.")
+        self.bytes_per_hit = chunks_alive * COPIES_PER_CHUNK * hit_bytes + ENGINE_BYTES_PER_HIT
+        self.initial = initial
+        self.n_events = 0
+        self.n_hits = 0
+        self.last_hits_per_event = 0.0
+
+    def next_size(self):
+        if self.n_events == 0:
+            size = self.initial
+        else:
+            hits_per_event = max(self.n_hits / self.n_events, self.last_hits_per_event)
+            size = int(self.budget // (hits_per_event * self.bytes_per_hit + EVENT_OVERHEAD_BYTES))
+        return min(max(size, MIN_CHUNK_EVENTS), MAX_CHUNK_EVENTS)
+
+    def record(self, n_events, n_hits):
+        if n_events > 0:
+            self.n_events += n_events
+            self.n_hits += n_hits
+            self.last_hits_per_event = n_hits / n_events
+
+
+def chunk_ranges(step_size, entry_start, entry_stop):
+    """
+    Yields (chunk_start, chunk_stop) covering [entry_start, entry_stop).
+
+    step_size is a fixed number of events or a ChunkSizer, which is asked for
+    the size of each chunk only once the previous one has been recorded.
+    """
+    chunk_start = entry_start
+    while chunk_start < entry_stop:
+        size = step_size.next_size() if isinstance(step_size, ChunkSizer) else step_size
+        chunk_stop = min(chunk_start + size, entry_stop)
+        yield chunk_start, chunk_stop
+        chunk_start = chunk_stop
@@ -1,73 +1,62 @@
-import ROOT
-from ROOT import std
-
-
-def write_reduced(input_filename, output_filename, index_data):
+import importlib.util
+import numpy as np
+
+
+# Hit-level branches the reduction engine needs, with their C++ element types
+HIT_BRANCHES = {
+    "detectorID": "int",
+    "elementID": "int",
+    "driftDistance": "double",
+    "tdcTime": "double",
+}
+
+NP_DTYPES = {
+    "short": np.int16,
+    "int": np.int32,
+    "unsigned int": np.uint32,
+    "long": np.int64,
+    "float": np.float32,
+    "double": np.float64,
+}
+
+# "bulk" copies whole NumPy slices into the output vectors with one C++ call per
+# branch and entry; "push_back" is the original per-hit loop, kept for comparison.
+# Only the ROOT backend has a per-entry write loop; uproot always writes whole chunks.
+WRITE_MODES = ("bulk", "push_back")
+
+# "uproot" needs only uproot/awkward; "root" needs PyROOT and writes std::vector branches.
+# "auto" is "root" whenever PyROOT is importable, so the reduced file keeps the
+# std::vector branches Fun4Sim.C reads, and "uproot" otherwise.
+BACKENDS = ("uproot", "root")
+DEFAULT_BACKEND = "auto"
+
+
+def resolve_backend(name=DEFAULT_BACKEND):
     """
-    Writes a new ROOT file with all branches preserved, but specific hit-level branches
-    ('detectorID', 'elementID', 'driftDistance', 'tdcTime') filtered using keep_idx.
+    The backend name "auto" stands for here (see DEFAULT_BACKEND); other names as is.
     """
-    # Open input file
-    input_file = ROOT.TFile.Open(input_filename, "READ")
-    tree_in = input_file.Get("tree")
-    if not tree_in:
-        raise RuntimeError("Could not find 'tree' in input ROOT file.")
-
-    # Prepare output file
-    output_file = ROOT.TFile.Open(output_filename, "RECREATE", "", 1)
-    output_file.SetCompressionLevel(5)
-    output_file.cd()
-
-    # Clone tree structure only (no entries yet)
-    tree_out = tree_in.CloneTree(0)
-    tree_out.SetAutoFlush(2500)
-    tree_out.SetBasketSize("*", 64000)
-
-    # Input vectors
-    detectorID = std.vector("int")()
-    elementID = std.vector("int")()
-    driftDistance = std.vector("double")()
-    tdcTime = std.vector("double")()
-
-    tree_in.SetBranchAddress("detectorID", detectorID)
-    tree_in.SetBranchAddress("elementID", elementID)
-    tree_in.SetBranchAddress("driftDistance", driftDistance)
-    tree_in.SetBranchAddress("tdcTime", tdcTime)
-
-    # Output vectors
-    det_out = std.vector("int")()
-    ele_out = std.vector("int")()
-    drift_out = std.vector("double")()
-    tdc_out = std.vector("double")()
+    if name == "auto":
+        return "root" if importlib.util.find_spec("ROOT") is not None else "uproot"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown I/O backend '{name}', expected 'auto' or one of {BACKENDS}")
+    return name
 
-    tree_out.SetBranchAddress("detectorID", det_out)
-    tree_out.SetBranchAddress("elementID", ele_out)
-    tree_out.SetBranchAddress("driftDistance", drift_out)
-    tree_out.SetBranchAddress("tdcTime", tdc_out)
 
-    for entry in index_data:
-        i = entry["entry"]
-        keep_idx = entry["keep_idx"]
-
-        tree_in.GetEntry(i)
-
-        # Fill output vectors
-        det_out.clear()
-        ele_out.clear()
-        drift_out.clear()
-        tdc_out.clear()
-
-        for j in keep_idx:
-            det_out.push_back(detectorID[j])
-            ele_out.push_back(elementID[j])
-            drift_out.push_back(driftDistance[j])
-            tdc_out.push_back(tdcTime[j])
-
-        tree_out.Fill()
-
-    output_file.cd()
-    tree_out.Write("", ROOT.TObject.kOverwrite)
-    output_file.Close()
-    input_file.Close()
+def get_backend(name=DEFAULT_BACKEND):
+    """
+    Imports and returns the I/O backend module for name ("auto" is resolved
+    with resolve_backend).
 
-    print(f"Wrote reduced ROOT file to '{output_filename}'")
+    Both utils.uproot_io and utils.root_io provide EventSource (n_entries,
+    detect_hit_branches, iter_hit_chunks, writer, close), write_reduced and
+    merge_reduced with the same signatures, so the pipeline never touches
+    ROOT unless backend="root" is asked for or picked by "auto".
+    """
+    name = resolve_backend(name)
+    if name == "uproot":
+        from utils import uproot_io
+        return uproot_io
+    if name == "root":
+        from utils import root_io
+        return root_io
+    raise ValueError(f"Unknown I/O backend '{name}', expected one of {BACKENDS}")
@@ -0,0 +1,158 @@
+import os
+import tempfile
+import numpy as np
+
+
+DEFAULT_KEEP_MASK_BUDGET = 256 * 1024**2  # bytes held in RAM before spilling to disk
+
+
+class _SpillableArray:
+    """
+    Append-only 1D array that lives in RAM until spill() moves it to a raw file.
+    """
+
+    def __init__(self, dtype):
+        self.dtype = np.dtype(dtype)
+        self.parts = []
+        self.size = 0
+        self.path = None
+        self._fh = None
+
+    @property
+    def nbytes(self):
+        return self.size * self.dtype.itemsize
+
+    def append(self, arr):
+        arr = np.ascontiguousarray(arr, dtype=self.dtype)
+        if self._fh is not None:
+            self._fh.write(arr.tobytes())
+        else:
+            self.parts.append(arr)
+        self.size += arr.size
+
+    def spill(self, spill_dir=None):
+        fd, self.path = tempfile.mkstemp(suffix=".keep", dir=spill_dir)
+        self._fh = os.fdopen(fd, "wb")
+        for arr in self.parts:
+            self._fh.write(arr.tobytes())
+        self.parts = []
+
+    def finalize(self):
+        """
+        Returns the full array: in-memory, or a read-only memmap if spilled.
+        """
+        if self._fh is None:
+            return np.concatenate(self.parts) if self.parts else np.empty(0, self.dtype)
+        self._fh.close()
+        self._fh = None
+        if self.size == 0:
+            return np.empty(0, self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode="r", shape=(self.size,))
+
+    def remove(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+
+class KeepMaskStore:
+    """
+    Compact record of the keep decisions for a whole file.
+
+    Decisions are stored as a packed bitmap with one bit per input hit (in
+    entry order) plus int64 per-entry hit offsets, i.e. about 1 bit per hit
+    and 8 bytes per event. Once the store outgrows max_memory bytes both arrays
+    are spilled to files in spill_dir and reading goes through np.memmap, so
+    a multi-million-event file can be reduced in bounded RAM.
+    """
+
+    def __init__(self, max_memory=DEFAULT_KEEP_MASK_BUDGET, spill_dir=None):
+        self.max_memory = max_memory
+        self.spill_dir = spill_dir
+        self._bits = _SpillableArray(np.uint8)
+        self._offsets = _SpillableArray(np.int64)
+        self._offsets.append(np.zeros(1, dtype=np.int64))
+        self._carry = np.empty(0, dtype=bool)  # trailing bits not yet packed
+        self._n_hits = 0
+        self._final = None
+
+    @property
+    def spilled(self):
+        return self._bits.path is not None
+
+    @property
+    def nbytes(self):
+        return self._bits.nbytes + self._offsets.nbytes
+
+    def __len__(self):
+        return self._offsets.size - 1
+
+    def append(self, keep, offsets):
+        """
+        Adds the keep mask of one chunk.
+
+        Args:
+            keep (np.ndarray[bool]): keep mask over the flat hits of the chunk
+            offsets (np.ndarray[int]): per-event hit offsets of the chunk, length N+1
+        """
+        if self._final is not None:
+            raise RuntimeError("KeepMaskStore is finalized; no more chunks can be appended.")
+
+        offsets = np.asarray(offsets, dtype=np.int64)
+        self._offsets.append(offsets[1:] + self._n_hits)
+        self._n_hits += int(offsets[-1])
+
+        bits = np.concatenate([self._carry, np.asarray(keep, dtype=bool)])
+        n_full = bits.size - bits.size % 8
+        self._bits.append(np.packbits(bits[:n_full], bitorder="little"))
+        self._carry = bits[n_full:]
+
+        if not self.spilled and self.nbytes > self.max_memory:
+            self._bits.spill(self.spill_dir)
+            self._offsets.spill(self.spill_dir)
+
+    def finalize(self):
+        """
+        Flushes pending bits; called automatically on first read.
+        """
+        if self._final is None:
+            self._bits.append(np.packbits(self._carry, bitorder="little"))
+            self._carry = np.empty(0, dtype=bool)
+            self._final = (self._bits.finalize(), self._offsets.finalize())
+        return self._final
+
+    def iter_blocks(self, block_size=10000):
+        """
+        Yields (entry_start, keep, offsets) for consecutive blocks of entries,
+        with keep unpacked to a boolean mask and offsets relative to the block.
+        """
+        bits, offsets = self.finalize()
+        n_entries = len(self)
+        for entry_start in range(0, n_entries, block_size):
+            entry_stop = min(entry_start + block_size, n_entries)
+            lo, hi = int(offsets[entry_start]), int(offsets[entry_stop])
+
+            byte_lo, byte_hi = lo // 8, (hi + 7) // 8
+            unpacked = np.unpackbits(bits[byte_lo:byte_hi], bitorder="little")
+            keep = unpacked[lo - 8 * byte_lo:hi - 8 * byte_lo].astype(bool)
+
+            yield entry_start, keep, np.asarray(offsets[entry_start:entry_stop + 1]) - lo
+
+    def __iter__(self):
+        """
+        Yields (entry, keep_idx) for every entry, keep_idx relative to the entry.
+        """
+        for entry_start, keep, offsets in self.iter_blocks():
+            for k in range(len(offsets) - 1):
+                yield entry_start + k, np.flatnonzero(keep[offsets[k]:offsets[k + 1]])
+
+    def close(self):
+        """
+        Releases the arrays and deletes any spill files.
+        """
+        self._final = None
+        self._bits.remove()
+        self._offsets.remove()
@@ -0,0 +1,214 @@
+import heapq
+import json
+import os
+import time
+import numpy as np
+
+
+DEFAULT_TOP_K = 10
+DEFAULT_SAMPLE_EVENTS = 0   # events per chunk re-reduced alone to time them (opt-in)
+MAX_LISTED_REJECTED = 1000   # occupancy-rejected entries listed in the report; all are counted
+# Latency histogram edges in microseconds (log spaced, 1 µs .. 1 s)
+LATENCY_BIN_EDGES_US = np.logspace(0, 6, 25)
+
+
+class ReductionProfile:
+    """
+    Cheap counters for a reduction run, meant to stay on in production.
+
+    Per filter stage: calls, cumulative time, hits in, hits out and events
+    touched (events that lost at least one hit to that stage). Per chunk: the
+    reduction time, whose mean per event goes into a chunk-mean latency
+    histogram, plus the top_k slowest chunks and the top_k events with the
+    most input hits. The size of every chunk is kept too, since chunks are
+    resized under a memory budget (ChunkSizer). Entries rejected by the
+    occupancy cut are counted and the first MAX_LISTED_REJECTED are listed;
+    the occupancyRejected branch of the output marks all of them.
+
+    The engine reduces whole chunks, so per-event latency is measured on a
+    sample: sample_events() picks up to sample_events evenly spread events of
+    every chunk plus its busiest one, which the caller reduces again one at a
+    time and reports with record_event(). Those fill the per-event latency
+    histogram and the top_k slowest events. Re-reducing them is not free
+    (up to about 10% at 8 events per chunk), so sampling is off unless
+    sample_events > 0.
+    """
+
+    def __init__(self, top_k=DEFAULT_TOP_K, sample_events=DEFAULT_SAMPLE_EVENTS):
+        self.top_k = top_k
+        self.n_sample = sample_events
+        self.filters = {}
+        self.n_events = 0
+        self.n_hits_in = 0
+        self.n_hits_out = 0
+        self.chunk_latency_counts = np.zeros(LATENCY_BIN_EDGES_US.size + 1, dtype=np.int64)
+        self.event_latency_counts = np.zeros(LATENCY_BIN_EDGES_US.size + 1, dtype=np.int64)
+        self._slowest = []   # min-heap of (us_per_event, entry_start, n_events, n_hits, seconds)
+        self._busiest = []   # min-heap of (n_hits, entry)
+        self._slowest_events = []   # min-heap of (us, entry, n_hits)
+        self.chunk_events = []   # (entry_start, n_events) of every chunk
+        self.n_rejected = 0   # entries that failed the occupancy cut
+        self.rejected_entries = []   # the lowest MAX_LISTED_REJECTED of them, sorted
+
+    def run_filter(self, name, fn, batch, keep, *args):
+        """
+        Calls fn(batch, *args, keep) and records its time and hit counts.
+        """
+        t0 = time.perf_counter()
+        new_keep = fn(batch, *args, keep)
+        dt = time.perf_counter() - t0
+
+        removed_evt = batch.evt[keep & ~new_keep]   # sorted, so runs are events
+        s = self.filters.setdefault(name, {"calls": 0, "seconds": 0.0, "hits_in": 0,
+                                           "hits_out": 0, "events_touched": 0})
+        s["calls"] += 1
+        s["seconds"] += dt
+        s["hits_in"] += int(np.count_nonzero(keep))
+        s["hits_out"] += int(np.count_nonzero(new_keep))
+        if removed_evt.size:
+            s["events_touched"] += int(np.count_nonzero(removed_evt[1:] != removed_evt[:-1])) + 1
+        return new_keep
+
+    def record_chunk(self, entry_start, offsets, keep, seconds):
+        """
+        Records one reduced chunk: its time, per-event latency and hit counts.
+        """
+        offsets = np.asarray(offsets)
+        n_events = offsets.size - 1
+        n_hits = int(offsets[-1])
+        self.n_events += n_events
+        self.n_hits_in += n_hits
+        self.n_hits_out += int(np.count_nonzero(keep))
+        self.chunk_events.append((int(entry_start), n_events))
+        if n_events == 0:
+            return
+
+        us_per_event = 1e6 * seconds / n_events
+        self.chunk_latency_counts[np.searchsorted(LATENCY_BIN_EDGES_US, us_per_event)] += n_events
+        self._push(self._slowest, (us_per_event, int(entry_start), n_events, n_hits, seconds))
+
+        hits = np.diff(offsets)
+        top = np.argpartition(hits, -self.top_k)[-self.top_k:] if hits.size > self.top_k else np.arange(hits.size)
+        for k in top.tolist():
+            self._push(self._busiest, (int(hits[k]), int(entry_start) + k))
+
+    def sample_events(self, offsets):
+        """
+        Chunk-local indices of the events to time one by one: up to
+        sample_events evenly spread over the chunk, plus the busiest event.
+        """
+        hits = np.diff(np.asarray(offsets))
+        if hits.size == 0 or self.n_sample <= 0:
+            return []
+        spread = np.linspace(0, hits.size - 1, min(self.n_sample, hits.size)).astype(np.int64)
+        return np.union1d(spread, [int(np.argmax(hits))]).tolist()
+
+    def record_event(self, entry, n_hits, seconds):
+        """
+        Records the reduction time of one event reduced on its own.
+        """
+        us = 1e6 * seconds
+        self.event_latency_counts[np.searchsorted(LATENCY_BIN_EDGES_US, us)] += 1
+        self._push(self._slowest_events, (us, int(entry), int(n_hits)))
+
+    def record_rejected(self, entries):
+        """
+        Records the tree entries rejected by the occupancy cut.
+        """
+        entries = np.asarray(entries)
+        self.n_rejected += entries.size
+        self._list_rejected(entries.tolist())
+
+    def _list_rejected(self, entries):
+        # entries come sorted (np.unique per chunk, or another profile's list)
+        if entries:
+            self.rejected_entries = sorted(self.rejected_entries + entries[:MAX_LISTED_REJECTED])[:MAX_LISTED_REJECTED]
+
+    def _push(self, heap, item):
+        if len(heap) < self.top_k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def merge(self, other):
+        """
+        Folds in the profile of another worker.
+        """
+        for name, s in other.filters.items():
+            mine = self.filters.setdefault(name, dict.fromkeys(s, 0))
+            for key, value in s.items():
+                mine[key] += value
+        self.n_events += other.n_events
+        self.n_hits_in += other.n_hits_in
+        self.n_hits_out += other.n_hits_out
+        self.chunk_latency_counts += other.chunk_latency_counts
+        self.event_latency_counts += other.event_latency_counts
+        for item in other._slowest:
+            self._push(self._slowest, item)
+        for item in other._slowest_events:
+            self._push(self._slowest_events, item)
+        for item in other._busiest:
+            self._push(self._busiest, item)
+        self.chunk_events.extend(other.chunk_events)
+        self.n_rejected += other.n_rejected
+        self._list_rejected(other.rejected_entries)
+
+    def to_dict(self):
+        return {
+            "n_events": self.n_events,
+            "n_hits_in": self.n_hits_in,
+            "n_hits_out": self.n_hits_out,
+            "filters": self.filters,
+            # Sampled events, each reduced on its own; counts[0] is below the
+            # first edge, counts[-1] above the last
+            "event_latency_us": {
+                "bin_edges": LATENCY_BIN_EDGES_US.tolist(),
+                "counts": self.event_latency_counts.tolist(),
+            },
+            # Every event counted once with the mean time per event of its chunk
+            "chunk_mean_latency_us": {
+                "bin_edges": LATENCY_BIN_EDGES_US.tolist(),
+                "counts": self.chunk_latency_counts.tolist(),
+            },
+            "slowest_events": [
+                {"entry": e, "n_hits": h, "us": us}
+                for us, e, h in sorted(self._slowest_events, reverse=True)
+            ],
+            "slowest_chunks": [
+                {"entry_start": e, "n_events": n, "n_hits": h, "seconds": s, "us_per_event": us}
+                for us, e, n, h, s in sorted(self._slowest, reverse=True)
+            ],
+            "busiest_events": [
+                {"entry": e, "n_hits": h} for h, e in sorted(self._busiest, reverse=True)
+            ],
+            # Events per chunk, in entry order
+            "chunk_events": [n for _, n in sorted(self.chunk_events)],
+            "occupancy_rejected": {
+                "count": self.n_rejected,
+                "first_entries": self.rejected_entries,
+            },
+        }
+
+    def write_json(self, path, **extra):
+        """
+        Writes the profile, plus any extra run metadata, as a JSON report.
+        """
+        report = dict(extra)
+        report.update(self.to_dict())
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    def print_summary(self):
+        print(f"{'Filter':<10} {'time [s]':>9} {'hits in':>12} {'hits out':>12} {'events hit':>11}")
+        for name, s in self.filters.items():
+            print(f"{name:<10} {s['seconds']:9.2f} {s['hits_in']:12d} {s['hits_out']:12d} "
+                  f"{s['events_touched']:11d}")
+        if "occupancy" in self.filters:
+            print(f"Occupancy cut rejected {self.n_rejected} of {self.n_events} events")
+
+
+def report_path(output_file):
+    """
+    JSON report written next to the output ROOT file.
+    """
+    return os.path.splitext(output_file)[0] + "_report.json"
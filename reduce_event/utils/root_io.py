@@ -0,0 +1,444 @@
+"""
+PyROOT I/O backend: reads hit chunks through SetBranchAddress and writes the
+reduced tree with CloneTree, so the output keeps the input's std::vector
+branches. Selected with backend="root" (see io_helpers.get_backend).
+"""
+
+import re
+import ROOT
+import numpy as np
+from ROOT import std
+from utils.io_helpers import HIT_BRANCHES, NP_DTYPES, WRITE_MODES
+from utils.chunk_sizer import ChunkSizer, chunk_ranges
+
+
+_VECTOR_CLASS = re.compile(r"vector<\s*([\w ]+?)\s*>")
+
+ROOT.gInterpreter.Declare("""
+#ifndef KTRACKER_VECTOR_FILL
+#define KTRACKER_VECTOR_FILL
+#include <cstdint>
+#include <vector>
+namespace ktracker {
+template <typename T>
+void fill_vector(std::vector<T>& dst, const T* src, std::size_t n) {
+    dst.assign(src, src + n);
+}
+template <typename T>
+void gather_vector(std::vector<T>& dst, const std::vector<T>& src,
+                   const std::int64_t* idx, std::size_t n) {
+    dst.resize(n);
+    for (std::size_t j = 0; j < n; ++j) dst[j] = src[idx[j]];
+}
+}
+#endif
+""")
+
+
+def fill_vector(vec, ctype, values):
+    """
+    Replaces the contents of std::vector<ctype> vec with a contiguous NumPy array.
+    """
+    values = np.ascontiguousarray(values, dtype=NP_DTYPES[ctype])
+    ROOT.ktracker.fill_vector[ctype](vec, values, values.size)
+
+
+def gather_vector(vec, ctype, src, keep_idx):
+    """
+    Sets vec to src[keep_idx] for two std::vector<ctype>, without a Python loop.
+    """
+    keep_idx = np.ascontiguousarray(keep_idx, dtype=np.int64)
+    ROOT.ktracker.gather_vector[ctype](vec, src, keep_idx, keep_idx.size)
+
+
+def enable_threads():
+    """
+    Lets the reader and writer of a source run in different threads
+    (run_reduction's prefetch pipeline); each uses its own TFile handle.
+    """
+    ROOT.EnableThreadSafety()
+
+
+def detect_hit_branches(tree, names=None, n_probe=100):
+    """
+    Finds the std::vector branches that hold one element per hit.
+
+    A vector branch qualifies when its size equals the size of detectorID in
+    each of the first n_probe entries that have hits. If names is given, only
+    those branches (plus HIT_BRANCHES) are considered, and they must all qualify.
+
+    Returns:
+        dict: branch name -> C++ element type, starting with HIT_BRANCHES
+    """
+    candidates = {}
+    for branch in tree.GetListOfBranches():
+        name = branch.GetName()
+        match = _VECTOR_CLASS.fullmatch(branch.GetClassName())
+        if names is not None and name not in names and name not in HIT_BRANCHES:
+            continue
+        if match and match.group(1) in NP_DTYPES:
+            candidates[name] = match.group(1)
+        elif names is not None:
+            raise RuntimeError(f"Branch '{name}' is not a numeric std::vector branch.")
+
+    missing = set(HIT_BRANCHES).union(names or ()) - set(candidates)
+    if missing:
+        raise RuntimeError(f"Hit branches missing from tree: {sorted(missing)}")
+
+    vectors = {name: std.vector(ctype)() for name, ctype in candidates.items()}
+    for name, vec in vectors.items():
+        tree.SetBranchAddress(name, vec)
+
+    matches = {name: True for name in candidates}
+    n_checked = 0
+    for i in range(tree.GetEntries()):
+        tree.GetBranch("detectorID").GetEntry(i, 1)
+        n_hits = vectors["detectorID"].size()
+        if n_hits == 0:
+            continue
+        for name in candidates:
+            tree.GetBranch(name).GetEntry(i, 1)
+            matches[name] &= vectors[name].size() == n_hits
+        n_checked += 1
+        if n_checked >= n_probe:
+            break
+
+    # Do not leave the tree pointing at vectors that are about to be freed
+    for name in candidates:
+        tree.ResetBranchAddress(tree.GetBranch(name))
+
+    if names is not None:
+        mismatched = [name for name in names if not matches[name]]
+        if mismatched:
+            raise RuntimeError(f"Branches do not have one entry per hit: {mismatched}")
+
+    hit_branches = dict(HIT_BRANCHES)
+    hit_branches.update({name: ctype for name, ctype in candidates.items() if matches[name]})
+    return hit_branches
+
+
+def vector_view(vec, ctype):
+    """
+    NumPy array over the data of a std::vector<ctype>, without copying.
+
+    The array is only valid until the vector is next modified (e.g. by the
+    next GetEntry on the branch it is bound to).
+    """
+    if vec.size() == 0:
+        return np.empty(0, dtype=NP_DTYPES[ctype])
+    # PyROOT gives std::vector of fundamental types an __array_interface__ on its data pointer
+    return np.asarray(vec)
+
+
+class HitVectorReader:
+    """
+    Per-entry access to the hit branches of a TTree as NumPy arrays.
+
+    The hit branches are bound once to std::vectors with SetBranchAddress and
+    are the only branches left enabled with SetBranchStatus, so GetEntry
+    decompresses nothing else. read(entry) returns, for every hit branch, a
+    view of the vector's own buffer (see vector_view): no Python object is
+    made per element, and the views are overwritten by the next read.
+    """
+
+    def __init__(self, tree, hit_branches=HIT_BRANCHES):
+        self.tree = tree
+        self.hit_branches = hit_branches
+        self.vectors = {name: std.vector(ctype)() for name, ctype in hit_branches.items()}
+
+        tree.SetBranchStatus("*", 0)
+        for name, vec in self.vectors.items():
+            tree.SetBranchStatus(name, 1)
+            tree.SetBranchAddress(name, vec)
+
+    def read(self, entry):
+        if self.tree.GetEntry(entry) <= 0:
+            raise RuntimeError(f"Could not read entry {entry} of the hit branches.")
+        return {name: vector_view(vec, self.hit_branches[name]) for name, vec in self.vectors.items()}
+
+
+def iter_hit_chunks(tree, step_size, hit_branches=HIT_BRANCHES, entry_start=0, entry_stop=None):
+    """
+    Iterates over entries [entry_start, entry_stop) of a TTree in blocks of
+    step_size entries; step_size may be a ChunkSizer, which then gets the
+    number of hits of every chunk read.
+
+    Only the hit_branches are enabled and read (see HitVectorReader), so the
+    remaining branches stay compressed until something actually needs them.
+    Each entry's vectors are copied straight from their buffers into the
+    chunk arrays, which grow as needed and keep their size between chunks.
+
+    Yields:
+        (chunk_start, hits, offsets): hits maps each hit branch to a flat
+        NumPy array for the block; offsets (length n_events + 1) delimits the
+        hits of each event.
+    """
+    reader = HitVectorReader(tree, hit_branches)
+
+    n_entries = tree.GetEntries()
+    if entry_stop is None or entry_stop > n_entries:
+        entry_stop = n_entries
+
+    buffers = {name: np.empty(0, dtype=NP_DTYPES[ctype]) for name, ctype in hit_branches.items()}
+
+    for chunk_start, chunk_stop in chunk_ranges(step_size, entry_start, entry_stop):
+        counts = np.zeros(chunk_stop - chunk_start, dtype=np.int64)
+        n_hits = 0
+
+        for k, i in enumerate(range(chunk_start, chunk_stop)):
+            views = reader.read(i)
+            n = views["detectorID"].size
+            if any(view.size != n for view in views.values()):
+                sizes = {name: view.size for name, view in views.items()}
+                raise RuntimeError(f"Hit branches out of step at entry {i}: {sizes}")
+
+            if n_hits + n > buffers["detectorID"].size:
+                capacity = max(2 * buffers["detectorID"].size, n_hits + n, 1024)
+                for name, buf in buffers.items():
+                    grown = np.empty(capacity, dtype=buf.dtype)
+                    grown[:n_hits] = buf[:n_hits]
+                    buffers[name] = grown
+
+            for name, view in views.items():
+                buffers[name][n_hits:n_hits + n] = view
+            counts[k] = n
+            n_hits += n
+
+        if isinstance(step_size, ChunkSizer):
+            step_size.record(chunk_stop - chunk_start, n_hits)
+
+        # Copies, since the buffers are refilled by the next chunk
+        hits = {name: buf[:n_hits].copy() for name, buf in buffers.items()}
+        offsets = np.zeros(counts.size + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        yield chunk_start, hits, offsets
+
+
+def _clone_with_event_branches(tree_in, event_branches):
+    """
+    Empty clone of tree_in for the output, without the input's copies of
+    event_branches (they are rewritten), auto-flushed every 2500 entries.
+    """
+    for name in event_branches:
+        if tree_in.GetBranch(name):
+            tree_in.SetBranchStatus(name, 0)
+    tree_out = tree_in.CloneTree(0)
+    tree_out.SetAutoFlush(2500)
+    tree_out.SetBasketSize("*", 64000)
+    return tree_out
+
+
+def _add_event_branches(tree_out, event_branches):
+    """
+    Adds one bool branch per event_branches name; returns the 1-element buffers to fill.
+    """
+    buffers = {}
+    for name in event_branches:
+        buffers[name] = np.zeros(1, dtype=np.bool_)
+        tree_out.Branch(name, buffers[name], f"{name}/O")
+    return buffers
+
+
+class ReducedTreeWriter:
+    """
+    Writes the reduced tree chunk by chunk while the input is still being read.
+
+    Hit branches are filled from the chunk arrays already in memory and are
+    switched off on the input tree, so the write pass only decompresses the
+    remaining branches. Every basket of the input file is read exactly once.
+
+    event_branches adds (or replaces) per-event bool branches, as in
+    uproot_io.ReducedTreeWriter.
+    """
+
+    def __init__(self, tree_in, output_filename, hit_branches=HIT_BRANCHES, write_mode="bulk",
+                 event_branches=None):
+        if write_mode not in WRITE_MODES:
+            raise ValueError(f"Unknown write_mode '{write_mode}', expected one of {WRITE_MODES}")
+        self.tree_in = tree_in
+        self.output_filename = output_filename
+        self.hit_branches = hit_branches
+        self.write_mode = write_mode
+        self.event_branches = event_branches or {}
+
+        self.output_file = ROOT.TFile.Open(output_filename, "RECREATE", "", 1)
+        self.output_file.SetCompressionLevel(5)
+        self.output_file.cd()
+
+        # Clone tree structure only (no entries yet)
+        self.tree_out = _clone_with_event_branches(tree_in, self.event_branches)
+        self.event_buffers = _add_event_branches(self.tree_out, self.event_branches)
+
+        self.out_vectors = {}
+        for name, ctype in hit_branches.items():
+            vec = std.vector(ctype)()
+            self.tree_out.SetBranchAddress(name, vec)
+            self.out_vectors[name] = vec
+            # Must come after CloneTree, which only clones active branches
+            tree_in.SetBranchStatus(name, 0)
+
+    def write_chunk(self, entry_start, hits, offsets, keep):
+        """
+        Fills one output entry per event of the chunk, keeping the hits selected by keep.
+        """
+        # One gather per branch for the whole chunk; events become contiguous slices
+        sel = np.flatnonzero(keep)
+        kept_offsets = np.concatenate(([0], np.cumsum(keep)))[offsets]
+        kept = {name: hits[name].take(sel) for name in self.out_vectors}
+        flags = {name: fn(hits, offsets) for name, fn in self.event_branches.items()}
+
+        for k in range(len(offsets) - 1):
+            self.tree_in.GetEntry(entry_start + k)
+            for name, buf in self.event_buffers.items():
+                buf[0] = flags[name][k]
+
+            lo, hi = kept_offsets[k], kept_offsets[k + 1]
+            for name, vec in self.out_vectors.items():
+                if self.write_mode == "bulk":
+                    fill_vector(vec, self.hit_branches[name], kept[name][lo:hi])
+                else:
+                    vec.clear()
+                    for x in kept[name][lo:hi].tolist():
+                        vec.push_back(x)
+
+            self.tree_out.Fill()
+
+    def close(self):
+        self.output_file.cd()
+        self.tree_out.Write("", ROOT.TObject.kOverwrite)
+        self.output_file.Close()
+
+        print(f"Wrote reduced ROOT file to '{self.output_filename}'")
+
+
+class EventSource:
+    """
+    Input tree opened with PyROOT, with the same interface as uproot_io.EventSource.
+    """
+
+    def __init__(self, input_filename, tree_name="tree"):
+        self.input_filename = input_filename
+        self.tree_name = tree_name
+        self.file = ROOT.TFile.Open(input_filename, "READ")
+        self.tree = self.file.Get(tree_name) if self.file else None
+        if not self.tree:
+            raise RuntimeError(f"Could not find '{tree_name}' in {input_filename}")
+        self._writer_files = []
+
+    @property
+    def n_entries(self):
+        return int(self.tree.GetEntries())
+
+    def detect_hit_branches(self, names=None, n_probe=100):
+        return detect_hit_branches(self.tree, names, n_probe)
+
+    def iter_hit_chunks(self, step_size, hit_branches=HIT_BRANCHES, entry_start=0, entry_stop=None):
+        return iter_hit_chunks(self.tree, step_size, hit_branches, entry_start, entry_stop)
+
+    def writer(self, output_filename, hit_branches=HIT_BRANCHES, write_mode="bulk", event_branches=None,
+               partial=False):
+        """
+        ReducedTreeWriter on a second handle of the input tree, since
+        iter_hit_chunks leaves only the hit branches enabled on self.tree while
+        the writer reads all the others. Close it before closing the source.
+        partial is accepted for compatibility with uproot_io: TFileMerger copies
+        the compressed baskets of the parts as they are, so parts are
+        compressed like the final output.
+        """
+        f = ROOT.TFile.Open(self.input_filename, "READ")
+        self._writer_files.append(f)
+        return ReducedTreeWriter(f.Get(self.tree_name), output_filename, hit_branches, write_mode,
+                                 event_branches)
+
+    def close(self):
+        for f in self._writer_files:
+            f.Close()
+        self.file.Close()
+
+
+def write_reduced(input_filename, output_filename, keep_store, write_mode="bulk",
+                  hit_branches=None, event_branches=None):
+    """
+    Writes a new ROOT file with all branches preserved, but every hit-level branch
+    filtered using the per-entry keep_idx recorded in keep_store (a KeepMaskStore).
+    hit_branches (name -> C++ type) defaults to detect_hit_branches(tree);
+    event_branches are added as in ReducedTreeWriter, one entry at a time.
+    """
+    event_branches = event_branches or {}
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"Unknown write_mode '{write_mode}', expected one of {WRITE_MODES}")
+
+    # Open input file
+    input_file = ROOT.TFile.Open(input_filename, "READ")
+    tree_in = input_file.Get("tree")
+    if not tree_in:
+        raise RuntimeError("Could not find 'tree' in input ROOT file.")
+
+    if hit_branches is None:
+        hit_branches = detect_hit_branches(tree_in)
+
+    # Prepare output file
+    output_file = ROOT.TFile.Open(output_filename, "RECREATE", "", 1)
+    output_file.SetCompressionLevel(5)
+    output_file.cd()
+
+    # Clone tree structure only (no entries yet)
+    tree_out = _clone_with_event_branches(tree_in, event_branches)
+    event_buffers = _add_event_branches(tree_out, event_branches)
+    single = np.zeros(2, dtype=np.int64)
+
+    # Input and output vectors for every hit branch
+    in_vectors, out_vectors = {}, {}
+    for name, ctype in hit_branches.items():
+        in_vectors[name] = std.vector(ctype)()
+        out_vectors[name] = std.vector(ctype)()
+        tree_in.SetBranchAddress(name, in_vectors[name])
+        tree_out.SetBranchAddress(name, out_vectors[name])
+
+    for i, keep_idx in keep_store:
+        tree_in.GetEntry(i)
+        if event_buffers:
+            hits = {name: vector_view(vec, hit_branches[name]) for name, vec in in_vectors.items()}
+            single[1] = in_vectors["detectorID"].size()
+            for name, buf in event_buffers.items():
+                buf[0] = event_branches[name](hits, single)[0]
+
+        for name, ctype in hit_branches.items():
+            src, dst = in_vectors[name], out_vectors[name]
+            if write_mode == "bulk":
+                gather_vector(dst, ctype, src, keep_idx)
+            else:
+                dst.clear()
+                for j in keep_idx.tolist():
+                    dst.push_back(src[j])
+
+        tree_out.Fill()
+
+    output_file.cd()
+    tree_out.Write("", ROOT.TObject.kOverwrite)
+    output_file.Close()
+    input_file.Close()
+
+    print(f"Wrote reduced ROOT file to '{output_filename}'")
+
+
+def merge_reduced(part_filenames, output_filename):
+    """
+    Concatenates reduced partial files into one tree, in the order given.
+
+    Uses TFileMerger's fast mode, which copies the compressed baskets as-is, so
+    the merged entries are identical to those in the parts.
+    """
+    merger = ROOT.TFileMerger(False)
+    if not merger.OutputFile(output_filename, "RECREATE", 1):
+        raise RuntimeError(f"Could not open '{output_filename}' for merging.")
+    merger.GetOutputFile().SetCompressionLevel(5)
+
+    for part in part_filenames:
+        if not merger.AddFile(part):
+            raise RuntimeError(f"Could not add partial file '{part}' to the merge.")
+    if not merger.Merge():
+        raise RuntimeError(f"Merging into '{output_filename}' failed.")
+
+    print(f"Merged {len(part_filenames)} partial files into '{output_filename}'")
@@ -0,0 +1,322 @@
+"""
+uproot I/O backend: reads only the requested branches, a chunk of entries at
+a time, straight into NumPy arrays and writes the reduced tree with uproot.
+No PyROOT import is needed. Selected with backend="uproot", or by the
+default "auto" when PyROOT is not importable (see io_helpers.get_backend).
+
+uproot cannot write std::vector branches: jagged branches are written as
+ROOT arrays with a counter branch (n<branch>, e.g. ndetectorID). uproot, and
+so the analysis and plotting scripts, read them exactly like the input's
+vectors; C++ code that binds std::vector addresses needs backend="root".
+"""
+
+import awkward as ak
+import numpy as np
+import uproot
+from utils.io_helpers import HIT_BRANCHES, NP_DTYPES
+from utils.chunk_sizer import ChunkSizer, chunk_ranges
+
+# C++ element type of each NumPy dtype, as stored in hit_branches
+CTYPES = {np.dtype(dtype): ctype for ctype, dtype in NP_DTYPES.items()}
+
+OUTPUT_COMPRESSION = uproot.ZLIB(5)   # what the ROOT backend writes
+PART_COMPRESSION = None               # partial files of workers=N runs, recompressed by merge_reduced
+MERGE_STEP_SIZE = "100 MB"            # read size per step when merging partial files
+
+
+def enable_threads():
+    """
+    Nothing to do: the reader and writer of a source use separate file
+    handles (see EventSource.writer), so they can run in different threads.
+    """
+
+
+def _jagged_dtype(branch):
+    """
+    Native element dtype of a jagged numeric branch (std::vector<T> or T[n]), else None.
+    """
+    interp = branch.interpretation
+    if isinstance(interp, uproot.AsJagged) and isinstance(interp.content, uproot.AsDtype):
+        return interp.content.to_dtype.newbyteorder("=")
+    return None
+
+
+def branch_types(tree):
+    """
+    Output type of every branch of tree, in branch order, for mktree.
+
+    Counter branches of jagged branches are left out, since mktree creates
+    them. Branches that are neither numeric scalars, fixed-size arrays nor
+    jagged numeric arrays cannot be written by uproot and raise an error.
+    """
+    types, counters = {}, set()
+    for branch in tree.branches:
+        name, interp = branch.name, branch.interpretation
+        dtype = _jagged_dtype(branch)
+        if dtype is not None:
+            types[name] = f"var * {dtype.name}"
+            if branch.count_branch is not None:
+                counters.add(branch.count_branch.name)
+        elif isinstance(interp, uproot.AsDtype):
+            dtype = interp.to_dtype
+            types[name] = np.dtype((dtype.base.newbyteorder("="), dtype.shape))
+        else:
+            raise RuntimeError(f"Branch '{name}' ({branch.typename}) cannot be written by the "
+                               f"uproot backend; use backend='root'.")
+    return {name: t for name, t in types.items() if name not in counters}
+
+
+def detect_hit_branches(tree, names=None, n_probe=100):
+    """
+    Finds the jagged numeric branches that hold one element per hit.
+
+    Same rules as root_io.detect_hit_branches: a branch qualifies when its size
+    equals the size of detectorID in each of the first n_probe entries that
+    have hits. If names is given, only those branches (plus HIT_BRANCHES) are
+    considered, and they must all qualify.
+
+    Returns:
+        dict: branch name -> C++ element type, starting with HIT_BRANCHES
+    """
+    candidates = {}
+    for branch in tree.branches:
+        name = branch.name
+        if names is not None and name not in names and name not in HIT_BRANCHES:
+            continue
+        dtype = _jagged_dtype(branch)
+        if dtype in CTYPES:
+            candidates[name] = CTYPES[dtype]
+        elif names is not None:
+            raise RuntimeError(f"Branch '{name}' is not a numeric std::vector branch.")
+
+    missing = set(HIT_BRANCHES).union(names or ()) - set(candidates)
+    if missing:
+        raise RuntimeError(f"Hit branches missing from tree: {sorted(missing)}")
+
+    # Read detectorID until n_probe entries with hits are found, then the
+    # candidates over the same entries
+    probe_stop, n_found = 0, 0
+    for arrays, report in tree.iterate(["detectorID"], step_size=10 * n_probe, library="ak",
+                                       how=dict, report=True):
+        with_hits = np.flatnonzero(ak.to_numpy(ak.num(arrays["detectorID"])))
+        if n_found + with_hits.size >= n_probe:
+            probe_stop = report.tree_entry_start + int(with_hits[n_probe - n_found - 1]) + 1
+            break
+        n_found += with_hits.size
+        probe_stop = report.tree_entry_stop
+
+    arrays = tree.arrays(list(candidates), entry_stop=probe_stop, library="ak", how=dict)
+    n_hits = ak.to_numpy(ak.num(arrays["detectorID"]))
+    with_hits = n_hits > 0
+    matches = {name: bool(np.array_equal(ak.to_numpy(ak.num(arrays[name]))[with_hits],
+                                         n_hits[with_hits]))
+               for name in candidates}
+
+    if names is not None:
+        mismatched = [name for name in names if not matches[name]]
+        if mismatched:
+            raise RuntimeError(f"Branches do not have one entry per hit: {mismatched}")
+
+    hit_branches = dict(HIT_BRANCHES)
+    hit_branches.update({name: ctype for name, ctype in candidates.items() if matches[name]})
+    return hit_branches
+
+
+def iter_hit_chunks(tree, step_size, hit_branches=HIT_BRANCHES, entry_start=0, entry_stop=None):
+    """
+    Iterates over entries [entry_start, entry_stop) of a tree in blocks of
+    step_size entries, reading only the hit_branches. step_size may be a
+    ChunkSizer, which then gets the number of hits of every chunk read.
+
+    Yields:
+        (chunk_start, hits, offsets), as root_io.iter_hit_chunks
+    """
+    n_entries = tree.num_entries
+    if entry_stop is None or entry_stop > n_entries:
+        entry_stop = n_entries
+    if entry_start >= entry_stop:
+        return
+
+    names = list(hit_branches)
+    if isinstance(step_size, ChunkSizer):
+        blocks = ((start, stop, tree.arrays(names, entry_start=start, entry_stop=stop,
+                                            library="ak", how=dict))
+                  for start, stop in chunk_ranges(step_size, entry_start, entry_stop))
+    else:
+        # Fixed steps: iterate reuses baskets that straddle two chunks
+        blocks = ((report.tree_entry_start, report.tree_entry_stop, arrays)
+                  for arrays, report in tree.iterate(names, step_size=step_size, entry_start=entry_start,
+                                                     entry_stop=entry_stop, library="ak", how=dict,
+                                                     report=True))
+
+    for chunk_start, chunk_stop, arrays in blocks:
+        counts = ak.to_numpy(ak.num(arrays["detectorID"]))
+        hits = {}
+        for name in names:
+            if not np.array_equal(ak.to_numpy(ak.num(arrays[name])), counts):
+                raise RuntimeError(f"Hit branch '{name}' out of step with detectorID in entries "
+                                   f"[{chunk_start}, {chunk_stop})")
+            hits[name] = ak.to_numpy(ak.flatten(arrays[name]))
+
+        offsets = np.zeros(counts.size + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        if isinstance(step_size, ChunkSizer):
+            step_size.record(chunk_stop - chunk_start, int(offsets[-1]))
+
+        yield chunk_start, hits, offsets
+
+
+class ReducedTreeWriter:
+    """
+    Writes the reduced tree chunk by chunk while the input is still being read.
+
+    Hit branches are filled from the chunk arrays already in memory; the other
+    branches of the same entries are read from tree_in as whole arrays, so
+    they are never unpacked into Python objects. Every chunk becomes one
+    basket per branch in the output.
+
+    event_branches adds (or replaces) per-event bool branches: name ->
+    fn(hits, offsets), called on every chunk for one value per event.
+    """
+
+    def __init__(self, tree_in, output_filename, hit_branches=HIT_BRANCHES, event_branches=None,
+                 compression=OUTPUT_COMPRESSION):
+        self.tree_in = tree_in
+        self.output_filename = output_filename
+        self.hit_branches = hit_branches
+        self.event_branches = event_branches or {}
+
+        self.branch_types = branch_types(tree_in)
+        self.branch_types.update(dict.fromkeys(self.event_branches, np.bool_))
+        self.other_branches = [name for name in self.branch_types
+                               if name not in hit_branches and name not in self.event_branches]
+
+        self.output_file = uproot.recreate(output_filename, compression=compression)
+        self.tree_out = self.output_file.mktree(tree_in.name, self.branch_types, title=tree_in.title)
+
+    def write_chunk(self, entry_start, hits, offsets, keep):
+        """
+        Appends the events of the chunk, keeping the hits selected by keep.
+        """
+        n_events = len(offsets) - 1
+        sel = np.flatnonzero(keep)
+        kept_offsets = np.concatenate(([0], np.cumsum(keep)))[offsets]
+
+        data = {}
+        if self.other_branches:
+            data = self.tree_in.arrays(self.other_branches, entry_start=entry_start,
+                                       entry_stop=entry_start + n_events, library="ak", how=dict)
+        counts = np.diff(kept_offsets)
+        for name in self.hit_branches:
+            data[name] = ak.unflatten(hits[name].take(sel), counts)
+        for name, fn in self.event_branches.items():
+            data[name] = np.asarray(fn(hits, offsets), dtype=np.bool_)
+
+        self.tree_out.extend({name: data[name] for name in self.branch_types})
+
+    def close(self):
+        self.output_file.close()
+
+        print(f"Wrote reduced ROOT file to '{self.output_filename}'")
+
+
+class EventSource:
+    """
+    Input tree opened with uproot.
+
+    Provides n_entries, detect_hit_branches, iter_hit_chunks and writer (a
+    ReducedTreeWriter on this tree); root_io.EventSource has the same interface.
+    """
+
+    def __init__(self, input_filename, tree_name="tree"):
+        self.input_filename = input_filename
+        self.tree_name = tree_name
+        self.file = uproot.open(input_filename)
+        if tree_name not in self.file:
+            self.file.close()
+            raise RuntimeError(f"Could not find '{tree_name}' in {input_filename}")
+        self.tree = self.file[tree_name]
+        self._writer_files = []
+
+    @property
+    def n_entries(self):
+        return int(self.tree.num_entries)
+
+    def detect_hit_branches(self, names=None, n_probe=100):
+        return detect_hit_branches(self.tree, names, n_probe)
+
+    def iter_hit_chunks(self, step_size, hit_branches=HIT_BRANCHES, entry_start=0, entry_stop=None):
+        return iter_hit_chunks(self.tree, step_size, hit_branches, entry_start, entry_stop)
+
+    def writer(self, output_filename, hit_branches=HIT_BRANCHES, write_mode="bulk", event_branches=None,
+               partial=False):
+        """
+        ReducedTreeWriter on a second handle of the input tree, so that it can
+        read the other branches in another thread than iter_hit_chunks.
+        write_mode only applies to the ROOT backend. partial=True writes a
+        part file for merge_reduced, uncompressed (PART_COMPRESSION), since the
+        merge decompresses and recompresses everything anyway.
+        """
+        f = uproot.open(self.input_filename)
+        self._writer_files.append(f)
+        return ReducedTreeWriter(f[self.tree_name], output_filename, hit_branches, event_branches,
+                                 PART_COMPRESSION if partial else OUTPUT_COMPRESSION)
+
+    def close(self):
+        for f in self._writer_files:
+            f.close()
+        self.file.close()
+
+
+def write_reduced(input_filename, output_filename, keep_store, write_mode="bulk",
+                  hit_branches=None, event_branches=None, block_size=10000):
+    """
+    Two-pass writer: re-reads the input in blocks of block_size entries and
+    writes it with the keep decisions recorded in keep_store (a KeepMaskStore).
+    hit_branches (name -> C++ type) defaults to detect_hit_branches(tree);
+    event_branches are added as in ReducedTreeWriter; write_mode is accepted
+    for compatibility with root_io.write_reduced.
+    """
+    source = EventSource(input_filename)
+    if hit_branches is None:
+        hit_branches = source.detect_hit_branches()
+
+    writer = source.writer(output_filename, hit_branches, event_branches=event_branches)
+    chunks = source.iter_hit_chunks(block_size, hit_branches)
+    for (entry_start, keep, offsets), (chunk_start, hits, _) in zip(keep_store.iter_blocks(block_size), chunks):
+        if chunk_start != entry_start:
+            raise RuntimeError(f"Keep mask block at entry {entry_start} does not match input chunk {chunk_start}")
+        writer.write_chunk(entry_start, hits, offsets, keep)
+
+    writer.close()
+    source.close()
+
+
+def merge_reduced(part_filenames, output_filename):
+    """
+    Concatenates reduced partial files into one tree, in the order given.
+
+    uproot cannot copy compressed baskets the way TFileMerger does, so every
+    part is streamed back in MERGE_STEP_SIZE steps and appended to the output
+    with extend; the merged entries are identical to those in the parts and
+    at most one step is held in memory.
+
+    The cost is one serial pass that compresses the whole output in this
+    process (about 2 s for 40k events of 250 hits, most of the merge time).
+    Workers write their parts uncompressed (EventSource.writer(partial=True))
+    so that they skip compression and the merge skips decompression.
+    """
+    with uproot.open(part_filenames[0]) as first:
+        tree = first["tree"]
+        types = branch_types(tree)
+        title = tree.title
+
+    with uproot.recreate(output_filename, compression=OUTPUT_COMPRESSION) as output_file:
+        tree_out = output_file.mktree("tree", types, title=title)
+        for part in part_filenames:
+            with uproot.open(part) as f:
+                for arrays in f["tree"].iterate(list(types), step_size=MERGE_STEP_SIZE,
+                                                library="ak", how=dict):
+                    tree_out.extend(arrays)
+
+    print(f"Merged {len(part_filenames)} partial files into '{output_filename}'")
@@ -1,3 +1,5 @@
+import argparse
+import os
 import uproot
 import numpy as np
 import matplotlib.pyplot as plt
@@ -7,49 +9,107 @@ from scipy.optimize import curve_fit
 def gaussian(x, amp, mean, sigma):
     return amp * np.exp(-(x - mean)**2 / (2 * sigma**2))
 
-# Open the ROOT file
-file = uproot.open("run_002281_spill_000000000_spin_vector.root")
-tree = file["tree"]
-
-# Read arrays
-detector_ids = tree["detectorIDs"].array(library="np")
-tdc_times = tree["tdcTimes"].array(library="np")
-
-# Flatten
-detector_ids_flat = np.concatenate(detector_ids)
-tdc_times_flat = np.concatenate(tdc_times)
-
-# Focus on a specific detector
-detector_id_focus = 32
-mask = (detector_ids_flat == detector_id_focus)
-tdc_filtered = tdc_times_flat[mask]
-
-# Plot histogram and fit
-counts, bin_edges = np.histogram(tdc_filtered, bins=100, range=(tdc_filtered.min(), tdc_filtered.max()))
-bin_centers = (bin_edges[:-1] + bin_edges[1:]) / 2
-
-# Initial guess for fit: (amplitude, mean, sigma)
-p0 = [counts.max(), bin_centers[np.argmax(counts)], 10.0]
-
-# Fit
-popt, pcov = curve_fit(gaussian, bin_centers, counts, p0=p0)
-
-# Extract fitted parameters
-amp, mean, sigma = popt
-print(f"Fitted center (mean): {mean:.2f} ns")
-print(f"Fitted width (sigma): {sigma:.2f} ns")
-
-# Plot
-plt.hist(tdc_filtered, bins=100, range=(tdc_filtered.min(), tdc_filtered.max()), alpha=0.6, label="TDC Data")
-x_fit = np.linspace(tdc_filtered.min(), tdc_filtered.max(), 500)
-y_fit = gaussian(x_fit, *popt)
-plt.plot(x_fit, y_fit, 'r--', label="Gaussian Fit")
-plt.xlabel("TDC Time (ns)")
-plt.ylabel("Counts")
-plt.title(f"TDC Time for Detector {detector_id_focus}")
-plt.legend()
-plt.grid(True)
-
-# Save or show
-plt.savefig(f"tdc_distribution_detector_{detector_id_focus}_gaussian_fit.png", dpi=300)
-plt.close()
+
+def fit_tdc(tdc_filtered, bins=100):
+    """
+    Fits a Gaussian to the TDC histogram of one detector.
+    Returns (amp, mean, sigma).
+    """
+    counts, bin_edges = np.histogram(tdc_filtered, bins=bins, range=(tdc_filtered.min(), tdc_filtered.max()))
+    bin_centers = (bin_edges[:-1] + bin_edges[1:]) / 2
+
+    # Initial guess for fit: (amplitude, mean, sigma)
+    p0 = [counts.max(), bin_centers[np.argmax(counts)], 10.0]
+
+    popt, pcov = curve_fit(gaussian, bin_centers, counts, p0=p0)
+    return popt
+
+
+def plot_fit(tdc_filtered, popt, detector_id_focus, output_path, bins=100):
+    plt.hist(tdc_filtered, bins=bins, range=(tdc_filtered.min(), tdc_filtered.max()), alpha=0.6, label="TDC Data")
+    x_fit = np.linspace(tdc_filtered.min(), tdc_filtered.max(), 500)
+    y_fit = gaussian(x_fit, *popt)
+    plt.plot(x_fit, y_fit, 'r--', label="Gaussian Fit")
+    plt.xlabel("TDC Time (ns)")
+    plt.ylabel("Counts")
+    plt.title(f"TDC Time for Detector {detector_id_focus}")
+    plt.legend()
+    plt.grid(True)
+
+    # Save or show
+    plt.savefig(output_path, dpi=300)
+    plt.close()
+
+
+def fit_all_detectors(root_filename, det_branch="detectorIDs", tdc_branch="tdcTimes",
+                      bins=100, min_hits=50, plot_dir=None):
+    """
+    Reads the file once and fits the TDC distribution of every detector.
+
+    Returns:
+        dict: detectorID -> (amp, mean, sigma, n_hits)
+    """
+    tree = uproot.open(root_filename)["tree"]
+    arrays = tree.arrays([det_branch, tdc_branch], library="np")
+
+    # Flatten, then group hits by detector with one sort
+    detector_ids_flat = np.concatenate(arrays[det_branch])
+    tdc_times_flat = np.concatenate(arrays[tdc_branch])
+    order = np.argsort(detector_ids_flat, kind="stable")
+    detector_ids_flat, tdc_times_flat = detector_ids_flat[order], tdc_times_flat[order]
+    det_ids, starts, n_hits = np.unique(detector_ids_flat, return_index=True, return_counts=True)
+
+    if plot_dir:
+        os.makedirs(plot_dir, exist_ok=True)
+
+    results = {}
+    for detector_id_focus, start, n in zip(det_ids.tolist(), starts, n_hits):
+        if n < min_hits:
+            print(f"[SKIP] Detector {detector_id_focus}: only {n} hits")
+            continue
+
+        tdc_filtered = tdc_times_flat[start:start + n]
+        try:
+            popt = fit_tdc(tdc_filtered, bins)
+        except (RuntimeError, ValueError) as err:
+            print(f"[WARNING] Fit failed for detector {detector_id_focus}: {err}")
+            continue
+
+        amp, mean, sigma = popt
+        results[detector_id_focus] = (amp, mean, abs(sigma), int(n))
+
+        if plot_dir:
+            plot_fit(tdc_filtered, popt, detector_id_focus,
+                     f"{plot_dir}/tdc_distribution_detector_{detector_id_focus}_gaussian_fit.png", bins)
+
+    return results
+
+
+def write_tdc_windows(results, output_path, n_sigma=3.0):
+    """
+    Writes the calibration table read by filters.out_of_time_removal.load_tdc_windows:
+    window = center ± width/2 with width = 2 * n_sigma * sigma.
+    """
+    with open(output_path, "w") as f:
+        f.write("#detectorID\tcenter\twidth\tsigma\tn_hits\n")
+        for detector_id, (amp, mean, sigma, n) in sorted(results.items()):
+            f.write(f"{detector_id}\t{mean:.3f}\t{2 * n_sigma * sigma:.3f}\t{sigma:.3f}\t{n}\n")
+    print(f"Wrote TDC windows for {len(results)} detectors to '{output_path}'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit TDC time distributions and write per-detector TDC windows.")
+    parser.add_argument("input_file", nargs="?", default="run_002281_spill_000000000_spin_vector.root")
+    parser.add_argument("--output", default="tdc_windows.tsv", help="Calibration table to write")
+    parser.add_argument("--det-branch", default="detectorIDs")
+    parser.add_argument("--tdc-branch", default="tdcTimes")
+    parser.add_argument("--n-sigma", type=float, default=3.0, help="Half window width in units of sigma")
+    parser.add_argument("--min-hits", type=int, default=50, help="Skip detectors with fewer hits")
+    parser.add_argument("--plot-dir", default=None, help="Also save one fit plot per detector here")
+    args = parser.parse_args()
+
+    results = fit_all_detectors(args.input_file, args.det_branch, args.tdc_branch,
+                                min_hits=args.min_hits, plot_dir=args.plot_dir)
+    for detector_id, (amp, mean, sigma, n) in sorted(results.items()):
+        print(f"Detector {detector_id:2d}: center {mean:.2f} ns, sigma {sigma:.2f} ns ({n} hits)")
+    write_tdc_windows(results, args.output, args.n_sigma)